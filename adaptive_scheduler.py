@@ -0,0 +1,114 @@
+import math
+
+
+class AdaptiveScheduler:
+    """
+    Pick how many frames to skip between inferences from measured timings.
+
+    It keeps moving averages of the capture interval, the time to process a
+    frame without inference and the inference time itself. From those it
+    derives two cadences:
+
+    - active: the smallest skip the machine can sustain without falling behind
+      the camera (every frame, if inference is fast enough). Used while there
+      is activity in the scene.
+    - idle: the largest skip whose worst-case detection latency (waiting for
+      the next inference plus running it) still fits `latency_budget`. Used
+      while the scene is quiet, to save CPU/GPU.
+
+    The decision and the numbers behind it are available from stats().
+    """
+
+    def __init__(self, latency_budget=0.5, min_skip=1, max_skip=30, initial_skip=5, smoothing=0.2):
+        self.latency_budget = latency_budget
+        self.min_skip = min_skip
+        self.max_skip = max_skip
+        self.smoothing = smoothing
+
+        # Moving averages, in seconds (None until measured)
+        self.capture_interval = None
+        self.frame_time = None
+        self.inference_time = None
+
+        self.skip = initial_skip
+        self.active = False
+        self.budget_met = True
+        self.expected_latency = None
+        self.changes = 0
+
+    def _average(self, current, sample):
+        if current is None:
+            return sample
+        return current + self.smoothing * (sample - current)
+
+    def record_capture_interval(self, seconds):
+        """Time between two frames delivered by the source."""
+        if seconds > 0:
+            self.capture_interval = self._average(self.capture_interval, seconds)
+
+    def record_frame_time(self, seconds):
+        """Time spent on a frame outside the model."""
+        self.frame_time = self._average(self.frame_time, seconds)
+
+    def record_inference_time(self, seconds):
+        """Time spent running the model (for batched calls, the whole batch)."""
+        self.inference_time = self._average(self.inference_time, seconds)
+
+    def frame_period(self, skip):
+        """Average seconds per processed frame when running inference every `skip` frames."""
+        work = self.frame_time + self.inference_time / skip
+        # Frames can't be processed faster than the camera delivers them
+        if self.capture_interval is not None:
+            return max(work, self.capture_interval)
+        return work
+
+    def latency(self, skip):
+        """Worst-case seconds from something appearing to it being detected."""
+        return skip * self.frame_period(skip) + self.inference_time
+
+    def update(self, active):
+        """Choose the skip for the current scene state and return it."""
+        self.active = active
+        if self.frame_time is None or self.inference_time is None:
+            # Nothing measured yet: keep the initial cadence
+            return self.skip
+
+        # Smallest skip that keeps up with the camera
+        sustainable = self.min_skip
+        if self.capture_interval is not None:
+            spare = self.capture_interval - self.frame_time
+            if spare <= 0:
+                sustainable = self.max_skip
+            else:
+                sustainable = max(self.min_skip, min(self.max_skip, math.ceil(self.inference_time / spare)))
+
+        if active:
+            skip = sustainable
+        else:
+            # Largest skip that still meets the latency budget
+            skip = sustainable
+            while skip < self.max_skip and self.latency(skip + 1) <= self.latency_budget:
+                skip += 1
+
+        self.expected_latency = self.latency(skip)
+        self.budget_met = self.expected_latency <= self.latency_budget
+        if skip != self.skip:
+            self.changes += 1
+            self.skip = skip
+        return skip
+
+    def stats(self):
+        def ms(seconds):
+            return seconds * 1000.0 if seconds is not None else None
+
+        return {
+            "skip": self.skip,
+            "mode": "active" if self.active else "idle",
+            "capture_fps": 1.0 / self.capture_interval if self.capture_interval else None,
+            "frame_ms": ms(self.frame_time),
+            "inference_ms": ms(self.inference_time),
+            "expected_latency_ms": ms(self.expected_latency),
+            "latency_budget_ms": ms(self.latency_budget),
+            "budget_met": self.budget_met,
+            "changes": self.changes,
+        }
@@ -0,0 +1,77 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+
+class AlertDispatcher:
+    """
+    Run alert jobs (synthesis, tempo adjustment, handing audio to playback) on a worker pool.
+
+    `dispatch` returns immediately, so a slow TTS request never freezes the
+    detection loop or the Tk UI. At most `max_in_flight` jobs are queued or
+    running; beyond that new alerts are rejected rather than piling up.
+    """
+
+    def __init__(self, max_workers=2, max_in_flight=4, history=100):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="alert")
+        self.max_in_flight = max_in_flight
+        self.lock = threading.Lock()
+        self.in_flight = 0
+
+        self.dispatched = 0
+        self.rejected = 0
+        self.failed = 0
+        # Seconds from dispatch to the job finishing, for the last `history` alerts
+        self.latencies = deque(maxlen=history)
+
+    def dispatch(self, job, name="alert"):
+        """Queue job() on the pool. Returns False if too many alerts are already in flight."""
+        with self.lock:
+            if self.in_flight >= self.max_in_flight:
+                self.rejected += 1
+                return False
+            self.in_flight += 1
+            self.dispatched += 1
+
+        submitted_at = time.monotonic()
+        try:
+            self.executor.submit(self._run, job, name, submitted_at)
+        except RuntimeError:
+            # The pool was shut down
+            with self.lock:
+                self.in_flight -= 1
+                self.rejected += 1
+            return False
+        return True
+
+    def _run(self, job, name, submitted_at):
+        try:
+            job()
+        except Exception as e:
+            with self.lock:
+                self.failed += 1
+            print(f"[{datetime.now()}] Alert '{name}' failed: {e}")
+        finally:
+            latency = time.monotonic() - submitted_at
+            with self.lock:
+                self.in_flight -= 1
+                self.latencies.append(latency)
+
+    def stats(self):
+        """Counters plus average and maximum per-alert latency (ms) over the recent history."""
+        with self.lock:
+            latencies = list(self.latencies)
+            stats = {
+                "dispatched": self.dispatched,
+                "rejected": self.rejected,
+                "failed": self.failed,
+                "in_flight": self.in_flight,
+            }
+        stats["latency_avg_ms"] = 1000.0 * sum(latencies) / len(latencies) if latencies else 0.0
+        stats["latency_max_ms"] = 1000.0 * max(latencies) if latencies else 0.0
+        return stats
+
+    def close(self, wait=True):
+        self.executor.shutdown(wait=wait)
@@ -0,0 +1,267 @@
+import argparse
+import hashlib
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+
+# Artifact directories synced by default, relative to the base directory
+WATCH_DIRS = ["motion_frames_detected", "person_frames_detected", "event_clips", os.path.join("logs", "events")]
+
+# Files that are still being written or are scratch files
+SKIP_SUFFIXES = (".tmp", ".db", ".db-wal", ".db-shm")
+
+
+class ArchiveTarget:
+    """
+    Interface for archive destinations.
+
+    Objects are stored by content hash, so the same bytes are only ever
+    uploaded once, however many files (or syncs) refer to them.
+    """
+
+    name = "base"
+
+    def has(self, digest):
+        raise NotImplementedError
+
+    def put(self, digest, path):
+        """Store the file at `path` under `digest`."""
+        raise NotImplementedError
+
+    def delete(self, digest):
+        raise NotImplementedError
+
+    def put_manifest(self, path):
+        """Store a copy of the manifest (path -> digest), so the archive can be restored on its own."""
+        raise NotImplementedError
+
+
+class LocalDirectoryTarget(ArchiveTarget):
+    """Archive into a local (or mounted) directory: objects/<first 2 hex digits>/<digest>."""
+
+    name = "local"
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+
+    def _path(self, digest):
+        return os.path.join(self.root, "objects", digest[:2], digest)
+
+    def has(self, digest):
+        return os.path.exists(self._path(digest))
+
+    def put(self, digest, path):
+        destination = self._path(digest)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        # Copy under a temporary name, so an interrupted copy never looks complete
+        temp_path = destination + ".tmp"
+        shutil.copyfile(path, temp_path)
+        os.replace(temp_path, destination)
+
+    def delete(self, digest):
+        try:
+            os.remove(self._path(digest))
+        except FileNotFoundError:
+            pass
+
+    def put_manifest(self, path):
+        destination = os.path.join(self.root, "manifest.db")
+        temp_path = destination + ".tmp"
+        shutil.copyfile(path, temp_path)
+        os.replace(temp_path, destination)
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Archiver:
+    """
+    Incremental, deduplicated sync of detection artifacts to an ArchiveTarget.
+
+    A SQLite manifest remembers every synced file (path, size, mtime, digest),
+    so a sync only hashes files that are new or changed since the last one, and
+    only uploads contents the target doesn't already hold. Files modified in
+    the last `settle_time` seconds are left for the next sync, since they may
+    still be being written.
+
+    Archived entries outlive the local files (local cleanup doesn't delete
+    anything from the archive); with `retention_days`, entries older than that
+    are dropped from the manifest and local files past that age are no longer
+    synced. Objects nothing refers to anymore (expired, or replaced by a newer
+    version of a growing file) are deleted from the target.
+
+    After every sync that changed anything, a snapshot of the manifest is
+    stored in the target too, so the archive can be restored without this box.
+    """
+
+    def __init__(self, base_dir, target, manifest_path=None, watch_dirs=WATCH_DIRS, settle_time=10.0,
+                 retention_days=None):
+        self.base_dir = base_dir
+        self.target = target
+        self.watch_dirs = watch_dirs
+        self.settle_time = settle_time
+        self.retention_days = retention_days
+
+        if manifest_path is None:
+            manifest_path = os.path.join(base_dir, "archive_manifest.db")
+        self.conn = sqlite3.connect(manifest_path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                digest TEXT NOT NULL,
+                synced_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS files_digest ON files (digest);
+            CREATE INDEX IF NOT EXISTS files_mtime ON files (mtime);
+            CREATE TABLE IF NOT EXISTS objects (
+                digest TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                uploaded_at REAL NOT NULL
+            );
+        """)
+
+    def _scan(self):
+        """Yield (relative path, size, mtime) of every artifact in the watched directories."""
+        for watch_dir in self.watch_dirs:
+            stack = [os.path.join(self.base_dir, watch_dir)]
+            while stack:
+                try:
+                    entries = list(os.scandir(stack.pop()))
+                except FileNotFoundError:
+                    continue
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False) and not entry.name.endswith(SKIP_SUFFIXES):
+                        stat = entry.stat()
+                        yield os.path.relpath(entry.path, self.base_dir), stat.st_size, stat.st_mtime
+
+    def sync(self):
+        """Archive new and changed files. Returns a dict of counters."""
+        stats = {"scanned": 0, "unchanged": 0, "expired": 0, "uploaded": 0, "deduplicated": 0,
+                 "bytes_uploaded": 0, "errors": 0}
+        known = {path: (size, mtime) for path, size, mtime in self.conn.execute("SELECT path, size, mtime FROM files")}
+        now = time.time()
+        cutoff = None
+        if self.retention_days is not None:
+            cutoff = now - self.retention_days * 86400
+
+        for path, size, mtime in self._scan():
+            stats["scanned"] += 1
+            if cutoff is not None and mtime < cutoff:
+                # Already past retention: archiving it would only delete it again
+                stats["expired"] += 1
+                continue
+            if known.get(path) == (size, mtime):
+                stats["unchanged"] += 1
+                continue
+            if now - mtime < self.settle_time:
+                continue
+
+            try:
+                digest = file_digest(os.path.join(self.base_dir, path))
+                stored = self.conn.execute("SELECT 1 FROM objects WHERE digest = ?", (digest,)).fetchone()
+                if stored is None:
+                    if not self.target.has(digest):
+                        self.target.put(digest, os.path.join(self.base_dir, path))
+                        stats["uploaded"] += 1
+                        stats["bytes_uploaded"] += size
+                    else:
+                        stats["deduplicated"] += 1
+                    self.conn.execute("INSERT INTO objects (digest, size, uploaded_at) VALUES (?, ?, ?)",
+                                      (digest, size, now))
+                else:
+                    stats["deduplicated"] += 1
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO files (path, size, mtime, digest, synced_at) VALUES (?, ?, ?, ?, ?)",
+                    (path, size, mtime, digest, now)
+                )
+                self.conn.commit()
+            except Exception as e:
+                # Files can disappear (e.g. retention) between the scan and the copy
+                print(f"[{datetime.now()}] Error archiving {path}: {e}")
+                stats["errors"] += 1
+
+        stats["deleted"] = self.apply_retention(cutoff)
+        if stats["uploaded"] or stats["deduplicated"] or stats["deleted"]:
+            self.store_manifest()
+        return stats
+
+    def store_manifest(self):
+        """Copy a consistent snapshot of the manifest into the target."""
+        fd, snapshot_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        try:
+            snapshot = sqlite3.connect(snapshot_path)
+            try:
+                self.conn.backup(snapshot)
+            finally:
+                snapshot.close()
+            self.target.put_manifest(snapshot_path)
+        finally:
+            os.remove(snapshot_path)
+
+    def apply_retention(self, cutoff=None):
+        """
+        Forget files modified before `cutoff` (if given) and delete the objects
+        nothing refers to anymore. Returns the number of objects deleted.
+        """
+        with self.conn:
+            if cutoff is not None:
+                self.conn.execute("DELETE FROM files WHERE mtime < ?", (cutoff,))
+            orphans = [row[0] for row in self.conn.execute(
+                "SELECT digest FROM objects WHERE digest NOT IN (SELECT digest FROM files)"
+            )]
+        for digest in orphans:
+            self.target.delete(digest)
+            with self.conn:
+                self.conn.execute("DELETE FROM objects WHERE digest = ?", (digest,))
+        return len(orphans)
+
+    def locate(self, path):
+        """Digest of an archived file (relative path), or None."""
+        row = self.conn.execute("SELECT digest FROM files WHERE path = ?", (path,)).fetchone()
+        return row[0] if row else None
+
+    def close(self):
+        self.conn.close()
+
+
+# -------------------------------
+# MAIN ENTRY POINT
+# -------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive detection artifacts incrementally.")
+    parser.add_argument("--target", required=True, help="archive directory")
+    parser.add_argument("--base-dir", default=os.getcwd(), help="directory holding the artifacts")
+    parser.add_argument("--manifest", help="manifest database (default: <base-dir>/archive_manifest.db)")
+    parser.add_argument("--retention-days", type=float, help="drop archived files older than this")
+    parser.add_argument("--loop", type=float, help="sync again every N seconds instead of once")
+    args = parser.parse_args()
+
+    archiver = Archiver(args.base_dir, LocalDirectoryTarget(args.target), args.manifest,
+                        retention_days=args.retention_days)
+    try:
+        while True:
+            started = time.time()
+            stats = archiver.sync()
+            print(f"[{datetime.now()}] Archive sync done in {time.time() - started:.1f}s: {stats}")
+            if not args.loop:
+                break
+            time.sleep(args.loop)
+    except KeyboardInterrupt:
+        print("[INFO] Stopping due to Ctrl + C.")
+    finally:
+        archiver.close()
@@ -0,0 +1,118 @@
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+
+class AudioArtifactManager:
+    """
+    Owns every audio file the TTS pipeline writes, under one spool directory.
+
+    - Scratch files get unique names in `<spool>/tmp`, so overlapping alerts from
+      several cameras never overwrite each other's files.
+    - Finished artifacts are committed under a key and reference counted while
+      they are being read; an artifact is only deleted when nobody holds it.
+    - The total size of committed artifacts is bounded by `max_bytes`; the least
+      recently used unreferenced artifacts are evicted first.
+    """
+
+    def __init__(self, spool_dir, max_bytes=64 * 1024 * 1024, suffix=".wav"):
+        self.spool_dir = spool_dir
+        self.tmp_dir = os.path.join(spool_dir, "tmp")
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> size in bytes, least recently used first
+        self.refcounts = {}
+        self.total_bytes = 0
+        self.evictions = 0
+
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        # Scratch files left behind by a crash are never going to be committed
+        for name in os.listdir(self.tmp_dir):
+            try:
+                os.remove(os.path.join(self.tmp_dir, name))
+            except OSError:
+                pass
+
+        # Account for artifacts from previous runs, oldest first
+        found = []
+        for name in os.listdir(self.spool_dir):
+            if not name.endswith(self.suffix):
+                continue
+            stat = os.stat(os.path.join(self.spool_dir, name))
+            found.append((stat.st_atime, name[:-len(self.suffix)], stat.st_size))
+        for _, key, size in sorted(found):
+            self.entries[key] = size
+            self.total_bytes += size
+        with self.lock:
+            self._evict()
+
+    def path_for(self, key):
+        return os.path.join(self.spool_dir, f"{key}{self.suffix}")
+
+    def new_temp(self, suffix=".tmp"):
+        """Return a unique scratch path; commit it or discard it when done."""
+        return os.path.join(self.tmp_dir, f"{uuid.uuid4().hex}{suffix}")
+
+    def discard(self, path):
+        """Delete a scratch file, if it exists."""
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def acquire(self, key):
+        """Return the artifact's path and hold a reference to it, or None if it doesn't exist."""
+        with self.lock:
+            if key not in self.entries:
+                return None
+            self.entries.move_to_end(key)
+            self.refcounts[key] = self.refcounts.get(key, 0) + 1
+            return self.path_for(key)
+
+    def release(self, key):
+        """Drop a reference taken by acquire/commit; the artifact becomes evictable at zero."""
+        with self.lock:
+            count = self.refcounts.get(key, 0) - 1
+            if count > 0:
+                self.refcounts[key] = count
+            else:
+                self.refcounts.pop(key, None)
+            self._evict()
+
+    def commit(self, key, temp_path):
+        """
+        Move a finished scratch file into the spool under `key` (atomically) and
+        return its path, holding a reference like acquire.
+        """
+        size = os.path.getsize(temp_path)
+        path = self.path_for(key)
+        with self.lock:
+            os.replace(temp_path, path)
+            self.total_bytes += size - self.entries.get(key, 0)
+            self.entries[key] = size
+            self.entries.move_to_end(key)
+            self.refcounts[key] = self.refcounts.get(key, 0) + 1
+            self._evict()
+        return path
+
+    def _evict(self):
+        # Caller holds the lock
+        for key in list(self.entries):
+            if self.total_bytes <= self.max_bytes:
+                break
+            if self.refcounts.get(key):
+                continue  # In use; try the next least recently used one
+            size = self.entries.pop(key)
+            self.total_bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(self.path_for(key))
+            except OSError as e:
+                print(f"[{datetime.now()}] Could not evict audio artifact {key}: {e}")
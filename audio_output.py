@@ -0,0 +1,269 @@
+import os
+import shutil
+import subprocess
+import threading
+import wave
+from datetime import datetime
+from tts_engines import SAMPLE_RATE, CHANNELS, SAMPLE_WIDTH
+
+# Alert priorities: a higher priority replaces queued lower ones and interrupts them while playing
+PRIORITY_MOTION = 0
+PRIORITY_ANIMAL = 1
+PRIORITY_PERSON = 2
+
+# PCM is written to the sink in small chunks, so playback can be interrupted between them
+CHUNK_BYTES = (SAMPLE_RATE // 20) * CHANNELS * SAMPLE_WIDTH  # 50 ms
+
+
+class NullSink:
+    """Discards audio; for headless test machines without a sound card."""
+
+    name = "null"
+
+    def open(self):
+        pass
+
+    def write(self, pcm):
+        pass
+
+    def end_clip(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class WavFileSink:
+    """Writes every clip to its own WAV file; for checking alerts on machines without audio."""
+
+    name = "file"
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.wav = None
+        self.count = 0
+
+    def open(self):
+        os.makedirs(self.directory, exist_ok=True)
+
+    def write(self, pcm):
+        if self.wav is None:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
+            self.count += 1
+            path = os.path.join(self.directory, f"alert_{timestamp}_{self.count}.wav")
+            self.wav = wave.open(path, "wb")
+            self.wav.setnchannels(CHANNELS)
+            self.wav.setsampwidth(SAMPLE_WIDTH)
+            self.wav.setframerate(SAMPLE_RATE)
+        self.wav.writeframes(pcm)
+
+    def end_clip(self):
+        if self.wav is not None:
+            self.wav.close()
+            self.wav = None
+
+    def close(self):
+        self.end_clip()
+
+
+class SoundDeviceSink:
+    """Plays through a long-lived PortAudio stream (needs the optional `sounddevice` package)."""
+
+    name = "sounddevice"
+
+    def __init__(self):
+        self.stream = None
+
+    def open(self):
+        import sounddevice  # Optional dependency, imported only when this sink is used
+        self.stream = sounddevice.RawOutputStream(samplerate=SAMPLE_RATE, channels=CHANNELS, dtype="int16")
+        self.stream.start()
+
+    def write(self, pcm):
+        self.stream.write(pcm)
+
+    def end_clip(self):
+        pass
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+
+
+class ProcessPipeSink:
+    """Streams raw PCM into one long-lived player process (aplay or pacat) for the whole session."""
+
+    name = "pipe"
+
+    COMMANDS = {
+        "aplay": ["aplay", "-q", "-t", "raw", "-f", "S16_LE", "-r", str(SAMPLE_RATE), "-c", str(CHANNELS), "-"],
+        "pacat": ["pacat", "--raw", "--format=s16le", f"--rate={SAMPLE_RATE}", f"--channels={CHANNELS}"],
+    }
+
+    def __init__(self, player="aplay"):
+        self.command = self.COMMANDS[player]
+        self.process = None
+
+    def open(self):
+        self.process = subprocess.Popen(
+            self.command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+
+    def write(self, pcm):
+        if self.process.poll() is not None:
+            # The player died (e.g. the audio device went away); start a new one
+            self.open()
+        self.process.stdin.write(pcm)
+        self.process.stdin.flush()
+
+    def end_clip(self):
+        pass
+
+    def close(self):
+        if self.process is not None:
+            self.process.stdin.close()
+            self.process.wait(timeout=5)
+            self.process = None
+
+
+def create_default_sink():
+    """
+    Pick a sink from VIGIA_AUDIO_SINK (null, file, sounddevice, aplay, pacat),
+    or the best one available on this machine.
+    """
+    choice = os.environ.get("VIGIA_AUDIO_SINK")
+    if choice == "null":
+        return NullSink()
+    if choice == "file":
+        return WavFileSink(os.path.join(os.getcwd(), "alerts_audio"))
+    if choice == "sounddevice":
+        return SoundDeviceSink()
+    if choice in ProcessPipeSink.COMMANDS:
+        return ProcessPipeSink(choice)
+
+    try:
+        import sounddevice  # noqa: F401
+        return SoundDeviceSink()
+    except (ImportError, OSError):
+        pass
+    for player in ProcessPipeSink.COMMANDS:
+        if shutil.which(player):
+            return ProcessPipeSink(player)
+    print(f"[{datetime.now()}] No audio output found, alerts will not be heard.")
+    return NullSink()
+
+
+class AudioOutputService:
+    """
+    One long-lived worker that plays PCM buffers from a priority queue.
+
+    Rules:
+    - Clips play highest priority first, in arrival order within a priority.
+    - A new clip removes any queued clips of lower priority (a person alert replaces
+      a queued motion alert) and interrupts a lower-priority clip that is playing.
+    - When the queue is full the new clip is dropped.
+    """
+
+    def __init__(self, sink=None, max_queue=8):
+        self.sink = sink if sink is not None else create_default_sink()
+        self.max_queue = max_queue
+
+        self.queue = []
+        self.condition = threading.Condition()
+        self.playing_priority = None
+        self._preempt = False
+
+        self.clips_played = 0
+        self.clips_replaced = 0
+        self.clips_preempted = 0
+        self.clips_dropped = 0
+
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        with self.condition:
+            if self._running:
+                return self
+            self._running = True
+            self._thread = threading.Thread(target=self._worker_loop, daemon=True)
+            self._thread.start()
+        return self
+
+    def play(self, pcm, priority=PRIORITY_MOTION):
+        """Queue a PCM buffer (common clip format) for playback. Returns False if it was dropped."""
+        if not self._running:
+            self.start()
+
+        with self.condition:
+            # Lower-priority alerts waiting in the queue are superseded by this one
+            kept = [clip for clip in self.queue if clip[0] >= priority]
+            self.clips_replaced += len(self.queue) - len(kept)
+            self.queue = kept
+
+            if len(self.queue) >= self.max_queue:
+                self.clips_dropped += 1
+                return False
+
+            if self.playing_priority is not None and self.playing_priority < priority:
+                self._preempt = True
+
+            self.queue.append((priority, pcm))
+            self.condition.notify_all()
+        return True
+
+    def _next_clip(self):
+        # Highest priority first; list order keeps arrival order within a priority
+        best = max(range(len(self.queue)), key=lambda i: (self.queue[i][0], -i))
+        return self.queue.pop(best)
+
+    def _worker_loop(self):
+        try:
+            self.sink.open()
+        except Exception as e:
+            print(f"[{datetime.now()}] Could not open audio sink '{self.sink.name}': {e}. Using null sink.")
+            self.sink = NullSink()
+
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.queue or not self._running)
+                if not self.queue:
+                    break
+                priority, pcm = self._next_clip()
+                self.playing_priority = priority
+                self._preempt = False
+
+            interrupted = False
+            try:
+                for offset in range(0, len(pcm), CHUNK_BYTES):
+                    if self._preempt:
+                        interrupted = True
+                        break
+                    self.sink.write(pcm[offset:offset + CHUNK_BYTES])
+                self.sink.end_clip()
+            except Exception as e:
+                print(f"[{datetime.now()}] Audio playback error: {e}")
+
+            with self.condition:
+                self.playing_priority = None
+                if interrupted:
+                    self.clips_preempted += 1
+                else:
+                    self.clips_played += 1
+                self.condition.notify_all()
+
+        self.sink.close()
+
+    def close(self, timeout=5.0):
+        """Finish the queued clips and stop the worker."""
+        with self.condition:
+            self._running = False
+            self.condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
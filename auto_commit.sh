@@ -1,26 +1,22 @@
 #!/bin/bash
 
-# Directories to monitor
-WATCH_DIRS=("motion_frames_detected" "person_frames_detected" "logs/motion_logs" "logs/person_logs")
+# Base directory holding motion_frames_detected, person_frames_detected, event_clips and logs/events
+BASE_PATH="$HOME/vigiar"
 
-# Git repository location
-REPO_PATH="$HOME/vigiar"
+# Archive location (a local disk or a mounted network share)
+ARCHIVE_PATH="${ARCHIVE_PATH:-$HOME/vigiar_archive}"
 
-# Navigate to the repository
-cd "$REPO_PATH" || { echo "Error: Could not change to directory $REPO_PATH"; exit 1; }
+# Keep archived artifacts this many days (empty to keep everything)
+RETENTION_DAYS="${RETENTION_DAYS:-}"
 
-# Check for changes
-if git diff --quiet && git diff --cached --quiet && git ls-files --others --exclude-standard --quiet; then
-  echo "No changes detected."
-else
-  # Stage changes
-  git add .
-  
-  # Commit changes with a timestamp
-  COMMIT_MESSAGE="Auto-commit on $(date '+%Y-%m-%d %H:%M:%S')"
-  git commit -m "$COMMIT_MESSAGE"
-  
-  # Push to the repository
-  git push origin main
-  echo "Changes committed and pushed to GitHub."
+# Navigate to the base directory
+cd "$BASE_PATH" || { echo "Error: Could not change to directory $BASE_PATH"; exit 1; }
+
+# Incremental, deduplicated sync: only new or changed files are hashed and copied,
+# so runs stay cheap however many frames and clips have accumulated
+ARGS=(--target "$ARCHIVE_PATH" --base-dir "$BASE_PATH")
+if [ -n "$RETENTION_DAYS" ]; then
+  ARGS+=(--retention-days "$RETENTION_DAYS")
 fi
+
+python3 "$(dirname "$(readlink -f "$0")")/archiver.py" "${ARGS[@]}"
@@ -0,0 +1,108 @@
+from collections import namedtuple
+
+import numpy as np
+
+# One detection, as yielded when iterating over Detections (track_id is None when untracked)
+Detection = namedtuple("Detection", ["label", "confidence", "bbox", "track_id"], defaults=(None,))
+
+
+class Detections:
+    """
+    Array-backed set of detections from one inference.
+
+    xyxy: (N, 4) int32 boxes in full-frame coordinates.
+    confidence: (N,) float32 scores.
+    class_id: (N,) int32 model class ids.
+    names: the model's {class_id: label} mapping, used to resolve labels lazily.
+    track_id: optional (N,) int32 ids assigned by the tracker.
+    """
+
+    __slots__ = ("xyxy", "confidence", "class_id", "names", "track_id")
+
+    def __init__(self, xyxy, confidence, class_id, names, track_id=None):
+        self.xyxy = xyxy
+        self.confidence = confidence
+        self.class_id = class_id
+        self.names = names
+        self.track_id = track_id
+
+    @classmethod
+    def empty(cls, names=None):
+        return cls(
+            np.empty((0, 4), dtype=np.int32),
+            np.empty(0, dtype=np.float32),
+            np.empty(0, dtype=np.int32),
+            names or {},
+        )
+
+    def __len__(self):
+        return len(self.class_id)
+
+    def __bool__(self):
+        return len(self.class_id) > 0
+
+    def __iter__(self):
+        for i in range(len(self.class_id)):
+            yield self[i]
+
+    def __getitem__(self, i):
+        cls_id = int(self.class_id[i])
+        return Detection(
+            self.names.get(cls_id, str(cls_id)),
+            float(self.confidence[i]),
+            tuple(int(v) for v in self.xyxy[i]),
+            int(self.track_id[i]) if self.track_id is not None else None,
+        )
+
+    @property
+    def labels(self):
+        return [self.names.get(int(c), str(int(c))) for c in self.class_id]
+
+
+def resolve_class_ids(names, allowed_labels):
+    """Sorted list of the model class ids whose label is in allowed_labels."""
+    return sorted(cls_id for cls_id, label in names.items() if label in allowed_labels)
+
+
+def build_class_mask(names, allowed_labels):
+    """Boolean lookup table indexed by class id: True for classes whose label is allowed."""
+    mask = np.zeros(max(names) + 1 if names else 0, dtype=bool)
+    for cls_id, label in names.items():
+        if label in allowed_labels:
+            mask[cls_id] = True
+    return mask
+
+
+def extract_detections(results, class_mask, names, offsets=None):
+    """
+    Pull the allowed detections out of ultralytics Results in one vectorized pass.
+
+    results: list of Results (one per image passed to the model).
+    class_mask: table from build_class_mask.
+    offsets: optional (dx, dy) per result, added to its boxes (e.g. for ROI crops).
+    """
+    all_xyxy, all_conf, all_cls = [], [], []
+    for i, r in enumerate(results):
+        boxes = r.boxes
+        if boxes is None or len(boxes) == 0:
+            continue
+
+        cls = boxes.cls.cpu().numpy().astype(np.int32)
+        in_range = cls < len(class_mask)
+        keep = np.zeros(len(cls), dtype=bool)
+        keep[in_range] = class_mask[cls[in_range]]
+        if not keep.any():
+            continue
+
+        xyxy = boxes.xyxy.cpu().numpy()[keep]
+        if offsets is not None:
+            dx, dy = offsets[i]
+            xyxy = xyxy + np.array([dx, dy, dx, dy], dtype=xyxy.dtype)
+
+        all_xyxy.append(xyxy.astype(np.int32))
+        all_conf.append(boxes.conf.cpu().numpy()[keep].astype(np.float32))
+        all_cls.append(cls[keep])
+
+    if not all_cls:
+        return Detections.empty(names)
+    return Detections(np.concatenate(all_xyxy), np.concatenate(all_conf), np.concatenate(all_cls), names)
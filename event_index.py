@@ -0,0 +1,188 @@
+import argparse
+import glob
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+# Default database location, next to the event journal
+EVENT_INDEX_PATH = os.path.join(os.getcwd(), "logs", "events.db")
+
+COLUMNS = ("time", "kind", "camera", "label", "confidence", "x1", "y1", "x2", "y2", "track_id", "frame")
+
+
+class EventIndex:
+    """
+    SQLite index of journal records, for queries like "people on camera 2
+    between 02:00 and 04:00" without listing directories or parsing file names.
+
+    add_records() takes the same dicts as EventJournal.append(); the journal's
+    writer thread calls it with every batch it persists. Indexes on (time),
+    (camera, time) and (label, time) keep range queries fast over months of data.
+
+    max_age: records older than this many seconds are pruned (checked at most
+    every `prune_interval` seconds), so the database stays bounded like the
+    journal it indexes. forget_frames() unlinks records from deleted artifacts.
+    """
+
+    def __init__(self, path=EVENT_INDEX_PATH, max_age=None, prune_interval=3600.0):
+        self.path = path
+        self.max_age = max_age
+        self.prune_interval = prune_interval
+        self.last_prune = 0
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS events (
+                id INTEGER PRIMARY KEY,
+                time REAL NOT NULL,
+                kind TEXT,
+                camera TEXT,
+                label TEXT,
+                confidence REAL,
+                x1 INTEGER, y1 INTEGER, x2 INTEGER, y2 INTEGER,
+                track_id INTEGER,
+                frame TEXT
+            );
+            CREATE INDEX IF NOT EXISTS events_time ON events (time);
+            CREATE INDEX IF NOT EXISTS events_camera_time ON events (camera, time);
+            CREATE INDEX IF NOT EXISTS events_label_time ON events (label, time);
+            CREATE INDEX IF NOT EXISTS events_frame ON events (frame);
+        """)
+
+    def add_records(self, records):
+        """Insert a batch of journal records in one transaction."""
+        rows = []
+        for record in records:
+            bbox = record.get("bbox") or (None, None, None, None)
+            rows.append((
+                record["time"], record.get("kind"), record.get("camera"), record.get("label"),
+                record.get("confidence"), bbox[0], bbox[1], bbox[2], bbox[3],
+                record.get("track_id"), record.get("frame"),
+            ))
+        with self.lock, self.conn:
+            self.conn.executemany(
+                f"INSERT INTO events ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})", rows
+            )
+        if self.max_age is not None and time.time() - self.last_prune >= self.prune_interval:
+            self.prune(time.time() - self.max_age)
+
+    def prune(self, before):
+        """Delete records older than `before` (epoch seconds). Returns the number deleted."""
+        with self.lock, self.conn:
+            deleted = self.conn.execute("DELETE FROM events WHERE time < ?", (before,)).rowcount
+        self.last_prune = time.time()
+        return deleted
+
+    def forget_frames(self, names):
+        """Clear references to these artifacts (file names), e.g. once retention removed them; the records stay."""
+        names = list(names)
+        with self.lock, self.conn:
+            self.conn.executemany("UPDATE events SET frame = NULL WHERE frame = ?", [(name,) for name in names])
+
+    def query(self, start=None, end=None, camera=None, label=None, kind=None, min_confidence=None,
+              region=None, limit=1000):
+        """
+        Return matching records (dicts, oldest first).
+        start/end: epoch seconds. region: (x1, y1, x2, y2); boxes overlapping it match.
+        """
+        clauses, params = [], []
+        for clause, value in (("time >= ?", start), ("time < ?", end), ("camera = ?", camera),
+                              ("label = ?", label), ("kind = ?", kind), ("confidence >= ?", min_confidence)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        if region is not None:
+            rx1, ry1, rx2, ry2 = region
+            clauses.append("x1 < ? AND x2 > ? AND y1 < ? AND y2 > ?")
+            params.extend([rx2, rx1, ry2, ry1])
+
+        sql = f"SELECT {', '.join(COLUMNS)} FROM events"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY time"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        with self.lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        return [dict(zip(COLUMNS, row)) for row in rows]
+
+    def import_journal(self, folder):
+        """(Re)build the index from the JSONL segments in a journal folder. Returns the record count."""
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM events")
+        count = 0
+        for path in sorted(glob.glob(os.path.join(folder, "*.jsonl"))):
+            with open(path) as f:
+                records = [json.loads(line) for line in f if line.strip()]
+            self.add_records(records)
+            count += len(records)
+        return count
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def parse_time(value):
+    """Epoch seconds or an ISO date/time ("2026-10-17 02:00")."""
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def parse_region(value):
+    region = tuple(int(v) for v in value.split(","))
+    if len(region) != 4:
+        raise argparse.ArgumentTypeError("region must be x1,y1,x2,y2")
+    return region
+
+
+# -------------------------------
+# MAIN ENTRY POINT
+# -------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the detection event index.")
+    parser.add_argument("--db", default=EVENT_INDEX_PATH, help="index database")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    query = commands.add_parser("query", help="list matching events")
+    query.add_argument("--from", dest="start", type=parse_time, help="start time (epoch or ISO)")
+    query.add_argument("--to", dest="end", type=parse_time, help="end time (epoch or ISO)")
+    query.add_argument("--camera")
+    query.add_argument("--label")
+    query.add_argument("--kind", help="motion, detection, new, dwell or lost")
+    query.add_argument("--min-confidence", type=float)
+    query.add_argument("--region", type=parse_region, help="x1,y1,x2,y2; boxes overlapping it match")
+    query.add_argument("--limit", type=int, default=1000)
+    query.add_argument("--json", action="store_true", help="print one JSON record per line")
+
+    rebuild = commands.add_parser("rebuild", help="rebuild the index from journal segments")
+    rebuild.add_argument("folder", help="journal folder (e.g. logs/events)")
+
+    args = parser.parse_args()
+    index = EventIndex(args.db)
+    if args.command == "rebuild":
+        print(f"[INFO] Indexed {index.import_journal(args.folder)} records.")
+    else:
+        for record in index.query(args.start, args.end, args.camera, args.label, args.kind,
+                                  args.min_confidence, args.region, args.limit):
+            if args.json:
+                print(json.dumps(record))
+                continue
+            when = datetime.fromtimestamp(record["time"]).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+            confidence = f"{record['confidence']:.2f}" if record["confidence"] is not None else "-"
+            bbox = (record["x1"], record["y1"], record["x2"], record["y2"]) if record["x1"] is not None else "-"
+            print(f"{when}  {record['camera']}  {record['kind']:<9} {record['label'] or '-':<8} "
+                  f"{confidence}  {bbox}  track={record['track_id']}  {record['frame'] or ''}")
+    index.close()
@@ -0,0 +1,196 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+
+class EventJournal:
+    """
+    Append-only JSONL journal of detection events, written on a background thread.
+
+    append() only queues the record, so the detection loop never waits for the
+    disk. The writer thread flushes batches every `flush_interval` seconds into
+    segment files named `<prefix>_YYYYmmdd_HHMMSS.jsonl`, starting a new segment
+    when the current one reaches `max_bytes`, is older than `rotate_interval`
+    seconds, or the day changes.
+
+    Each day also gets a small `index_YYYYmmdd.json` listing its segments with
+    their time range, record count and per-label/per-camera counts, so a day's
+    activity can be summarized (or the right segment found) without reading it.
+
+    index: optional EventIndex that gets every batch once it is on disk.
+    on_saved(path): optional callback for every segment and index file closed.
+    """
+
+    def __init__(self, folder, prefix="events", max_bytes=16 * 1024 * 1024, rotate_interval=3600.0,
+                 flush_interval=1.0, max_queue=10000, index=None, on_saved=None):
+        self.folder = folder
+        self.index = index
+        self.on_saved = on_saved
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.rotate_interval = rotate_interval
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+
+        self.pending = deque()
+        self.condition = threading.Condition()
+        self.records_written = 0
+        self.records_dropped = 0
+        self.write_errors = 0
+
+        # Current segment (only touched by the writer thread)
+        self._file = None
+        self._segment = None
+
+        self._closed = False
+        self._worker = None
+
+        os.makedirs(folder, exist_ok=True)
+
+    def start(self):
+        """Start the writer thread (called automatically on first append). A closed journal stays closed."""
+        with self.condition:
+            if self._worker is None and not self._closed:
+                self._worker = threading.Thread(target=self._writer_loop, daemon=True)
+                self._worker.start()
+        return self
+
+    def append(self, record):
+        """Queue a record (a JSON-serializable dict with a "time" epoch field). Returns False if dropped."""
+        if self._worker is None and not self._closed:
+            self.start()
+        with self.condition:
+            if self._closed:
+                return False
+            if len(self.pending) >= self.max_queue:
+                self.records_dropped += 1
+                return False
+            self.pending.append(record)
+            if len(self.pending) >= self.max_queue // 2:
+                # Don't wait for the timer when a burst is filling the queue
+                self.condition.notify_all()
+        return True
+
+    # -----------------------------
+    # Writer thread
+    # -----------------------------
+    def _writer_loop(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(
+                    lambda: self._closed or len(self.pending) >= self.max_queue // 2, self.flush_interval
+                )
+                batch = list(self.pending)
+                self.pending.clear()
+                closed = self._closed
+
+            if batch:
+                self._write_batch(batch)
+            if closed:
+                self._close_segment()
+                return
+
+    def _write_batch(self, batch):
+        try:
+            for record in batch:
+                self._maybe_rotate(record["time"])
+                line = json.dumps(record, separators=(",", ":")) + "\n"
+                self._file.write(line)
+                self._account(record, len(line))
+            self._file.flush()
+            with self.condition:
+                self.records_written += len(batch)
+        except Exception as e:
+            print(f"[{datetime.now()}] Error writing event journal: {e}")
+            with self.condition:
+                self.write_errors += 1
+
+        if self.index is not None:
+            try:
+                self.index.add_records(batch)
+            except Exception as e:
+                print(f"[{datetime.now()}] Error updating event index: {e}")
+
+    def _maybe_rotate(self, timestamp):
+        segment = self._segment
+        if segment is not None:
+            day = datetime.fromtimestamp(timestamp).strftime("%Y%m%d")
+            if (segment["bytes"] < self.max_bytes and time.time() - segment["opened"] < self.rotate_interval
+                    and day == segment["day"]):
+                return
+            self._close_segment()
+
+        started = datetime.fromtimestamp(timestamp)
+        name = f"{self.prefix}_{started.strftime('%Y%m%d_%H%M%S')}.jsonl"
+        # Two segments started within the same second get distinct names
+        suffix = 1
+        while os.path.exists(os.path.join(self.folder, name)):
+            name = f"{self.prefix}_{started.strftime('%Y%m%d_%H%M%S')}_{suffix}.jsonl"
+            suffix += 1
+        self._file = open(os.path.join(self.folder, name), "a")
+        self._segment = {
+            "file": name,
+            "day": started.strftime("%Y%m%d"),
+            "opened": time.time(),
+            "first": timestamp,
+            "last": timestamp,
+            "records": 0,
+            "bytes": 0,
+            "labels": {},
+            "cameras": {},
+        }
+
+    def _account(self, record, size):
+        segment = self._segment
+        segment["records"] += 1
+        segment["bytes"] += size
+        segment["first"] = min(segment["first"], record["time"])
+        segment["last"] = max(segment["last"], record["time"])
+        for field, counts in (("label", segment["labels"]), ("camera", segment["cameras"])):
+            value = record.get(field)
+            if value is not None:
+                counts[value] = counts.get(value, 0) + 1
+
+    def _close_segment(self):
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        try:
+            index_path = self._update_index(self._segment)
+            if self.on_saved is not None:
+                self.on_saved(os.path.join(self.folder, self._segment["file"]))
+                self.on_saved(index_path)
+        except Exception as e:
+            print(f"[{datetime.now()}] Error updating event journal index: {e}")
+        self._segment = None
+
+    def _update_index(self, segment):
+        """Add (or replace) the segment's summary in its day's index file."""
+        path = os.path.join(self.folder, f"index_{segment['day']}.json")
+        index = {"day": segment["day"], "segments": []}
+        if os.path.exists(path):
+            with open(path) as f:
+                index = json.load(f)
+        summary = {key: segment[key] for key in ("file", "first", "last", "records", "bytes", "labels", "cameras")}
+        index["segments"] = [s for s in index["segments"] if s["file"] != segment["file"]] + [summary]
+
+        temp_path = path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(index, f, indent=1)
+        os.replace(temp_path, path)
+        return path
+
+    def close(self, timeout=10.0):
+        """Write everything queued, close the current segment and stop the writer thread."""
+        with self.condition:
+            self._closed = True
+            self.condition.notify_all()
+        if self._worker is not None:
+            self._worker.join(timeout=timeout)
+            self._worker = None
+        print(f"[INFO] Event journal closed. Records written: {self.records_written}, "
+              f"dropped: {self.records_dropped}, errors: {self.write_errors}")
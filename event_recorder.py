@@ -0,0 +1,218 @@
+import cv2
+import json
+import os
+import threading
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+
+
+class EventRecorder:
+    """
+    Record one video clip per event, including a few seconds before it started.
+
+    Every processed frame is JPEG-compressed into an in-memory pre-roll ring
+    buffer covering the last `pre_roll` seconds. trigger() starts an event (or
+    extends the current one): the pre-roll, the event itself and `post_roll`
+    seconds after the last trigger are written as a single video segment, with
+    a JSON sidecar giving every frame's timestamp and detections.
+
+    Decoding and video encoding happen on a background thread, so the caller
+    only pays for the JPEG compression. on_saved(path) is called from that
+    thread for the sidecar and then the video of every finished clip.
+    """
+
+    def __init__(self, folder, camera, pre_roll=3.0, post_roll=5.0, max_duration=300.0, jpeg_quality=80,
+                 codec="mp4v", extension=".mp4", max_queue=512, on_saved=None):
+        self.folder = folder
+        self.camera = camera
+        self.pre_roll = pre_roll
+        self.post_roll = post_roll
+        self.max_duration = max_duration
+        self.encode_params = [int(cv2.IMWRITE_JPEG_QUALITY), jpeg_quality]
+        self.fourcc = cv2.VideoWriter_fourcc(*codec)
+        self.extension = extension
+        self.max_queue = max_queue
+        self.on_saved = on_saved
+
+        # (timestamp, jpeg, detections) of the last `pre_roll` seconds
+        self.ring = deque()
+
+        # Current event
+        self.recording = False
+        self.event_start = 0
+        self.event_end = 0
+        self.reasons = set()
+        self.clip_name = None  # video file name of the current event, for references from other logs
+
+        # Work for the writer thread: ("open", base_path, fps), ("reason", reason), ("frame", entry), ("close",)
+        self.pending = deque()
+        self.condition = threading.Condition()
+        self.frames_queued = 0  # frames in `pending`
+        self.frames_dropped = 0
+        self.clips_written = 0
+        self.write_errors = 0
+        self._closed = False
+        self._worker = threading.Thread(target=self._writer_loop, daemon=True)
+        self._worker.start()
+
+        os.makedirs(folder, exist_ok=True)
+
+    # -----------------------------
+    # Detection loop side
+    # -----------------------------
+    def push(self, frame, timestamp, detections=None):
+        """Add a processed (annotated) frame: to the current event, or to the pre-roll buffer."""
+        success, encoded = cv2.imencode(".jpg", frame, self.encode_params)
+        if not success:
+            return
+        boxes = []
+        if detections:
+            boxes = [
+                {"label": d.label, "confidence": round(d.confidence, 3), "bbox": list(d.bbox), "track_id": d.track_id}
+                for d in detections
+            ]
+        entry = (timestamp, encoded, boxes)
+
+        if self.recording:
+            self._queue_frame(entry)
+            if timestamp >= self.event_end or timestamp - self.event_start >= self.max_duration:
+                self._finish()
+            return
+
+        self.ring.append(entry)
+        while self.ring and timestamp - self.ring[0][0] > self.pre_roll:
+            self.ring.popleft()
+
+    def trigger(self, timestamp, reason):
+        """Start an event at `timestamp`, or keep the current one going for another `post_roll` seconds."""
+        if not self.recording:
+            self.recording = True
+            self.event_start = self.ring[0][0] if self.ring else timestamp
+            self.event_end = timestamp
+            self.reasons = set()
+
+            name = f"{self.camera}_{datetime.fromtimestamp(timestamp).strftime('%Y%m%d_%H%M%S_%f')[:-3]}"
+            base_path = os.path.join(self.folder, name)
+            self.clip_name = name + self.extension
+            with self.condition:
+                self.pending.append(("open", base_path, self._estimate_fps()))
+                self.condition.notify_all()
+            for entry in self.ring:
+                self._queue_frame(entry)
+            self.ring.clear()
+
+        self.event_end = max(self.event_end, timestamp + self.post_roll)
+        if reason not in self.reasons:
+            self.reasons.add(reason)
+            with self.condition:
+                self.pending.append(("reason", reason))
+                self.condition.notify_all()
+
+    def _estimate_fps(self):
+        """Frame rate of the pre-roll buffer, used as the clip's nominal rate."""
+        if len(self.ring) >= 2:
+            span = self.ring[-1][0] - self.ring[0][0]
+            if span > 0:
+                return (len(self.ring) - 1) / span
+        return 10.0
+
+    def _queue_frame(self, entry):
+        with self.condition:
+            if self.frames_queued >= self.max_queue:
+                # The writer can't keep up; the sidecar still matches what is written
+                self.frames_dropped += 1
+                return
+            self.pending.append(("frame", entry))
+            self.frames_queued += 1
+            self.condition.notify_all()
+
+    def _finish(self):
+        self.recording = False
+        with self.condition:
+            self.pending.append(("close",))
+            self.condition.notify_all()
+
+    # -----------------------------
+    # Writer thread
+    # -----------------------------
+    def _writer_loop(self):
+        clip = None
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.pending or self._closed)
+                if not self.pending:
+                    return
+                job = self.pending.popleft()
+                if job[0] == "frame":
+                    self.frames_queued -= 1
+
+            try:
+                if job[0] == "open":
+                    clip = {"base_path": job[1], "fps": job[2], "writer": None, "frames": [], "reasons": []}
+                elif clip is None:
+                    continue
+                elif job[0] == "reason":
+                    clip["reasons"].append(job[1])
+                elif job[0] == "frame":
+                    self._write_frame(clip, job[1])
+                elif job[0] == "close":
+                    self._close_clip(clip)
+                    clip = None
+            except Exception as e:
+                print(f"[{datetime.now()}] Failed to record event clip: {e}")
+                with self.condition:
+                    self.write_errors += 1
+                if clip is not None and clip["writer"] is not None:
+                    clip["writer"].release()
+                clip = None
+
+    def _write_frame(self, clip, entry):
+        timestamp, encoded, boxes = entry
+        frame = cv2.imdecode(np.frombuffer(encoded, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if clip["writer"] is None:
+            height, width = frame.shape[:2]
+            clip["size"] = (width, height)
+            clip["writer"] = cv2.VideoWriter(clip["base_path"] + self.extension, self.fourcc, clip["fps"], (width, height))
+            if not clip["writer"].isOpened():
+                raise IOError("Could not open video writer", clip["base_path"] + self.extension)
+        elif (frame.shape[1], frame.shape[0]) != clip["size"]:
+            frame = cv2.resize(frame, clip["size"])
+        clip["writer"].write(frame)
+        clip["frames"].append({"index": len(clip["frames"]), "timestamp": timestamp, "detections": boxes})
+
+    def _close_clip(self, clip):
+        if clip["writer"] is None:
+            return
+        clip["writer"].release()
+        frames = clip["frames"]
+        sidecar = {
+            "camera": self.camera,
+            "video": os.path.basename(clip["base_path"] + self.extension),
+            "start": frames[0]["timestamp"],
+            "end": frames[-1]["timestamp"],
+            "fps": clip["fps"],
+            "reasons": clip["reasons"],
+            "frames": frames,
+        }
+        with open(clip["base_path"] + ".json", "w") as f:
+            json.dump(sidecar, f)
+        if self.on_saved is not None:
+            self.on_saved(clip["base_path"] + ".json")
+            self.on_saved(clip["base_path"] + self.extension)
+        with self.condition:
+            self.clips_written += 1
+        print(f"[{datetime.now()}] Event clip saved: {clip['base_path'] + self.extension} "
+              f"({len(frames)} frames, {sidecar['end'] - sidecar['start']:.1f}s)")
+
+    def close(self, timeout=10.0):
+        """Finish the current event, write everything queued and stop the writer thread."""
+        if self.recording:
+            self._finish()
+        with self.condition:
+            self._closed = True
+            self.condition.notify_all()
+        self._worker.join(timeout=timeout)
+        print(f"[INFO] [{self.camera}] Event recorder closed. Clips: {self.clips_written}, "
+              f"frames dropped: {self.frames_dropped}, errors: {self.write_errors}")
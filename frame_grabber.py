@@ -0,0 +1,88 @@
+import time
+import threading
+from collections import deque
+from datetime import datetime
+
+
+class FrameGrabber:
+    """
+    Read frames from a cv2.VideoCapture on a background thread.
+
+    Only the newest `buffer_size` frames are kept; when the buffer is full the
+    oldest frame is dropped, so the consumer always works on a fresh frame
+    instead of whatever has been sitting in the driver buffer.
+    """
+
+    def __init__(self, vid, buffer_size=1):
+        self.vid = vid
+        self.buffer = deque(maxlen=buffer_size)
+        self.condition = threading.Condition()
+
+        self.frames_captured = 0
+        self.frames_dropped = 0
+        self.last_latency = 0.0  # Seconds between capture and hand-off to the consumer
+        self.failed = False
+
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        """Start the capture thread."""
+        if self._running:
+            return self
+        self._running = True
+        self._thread = threading.Thread(target=self._capture_loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def _capture_loop(self):
+        while self._running:
+            ret, frame = self.vid.read()
+            if not ret:
+                print(f"[{datetime.now()}] Frame grabber could not read from source.")
+                with self.condition:
+                    self.failed = True
+                    self.condition.notify_all()
+                break
+
+            with self.condition:
+                # A full deque silently discards its oldest entry on append
+                if len(self.buffer) == self.buffer.maxlen:
+                    self.frames_dropped += 1
+                self.buffer.append((time.time(), frame))
+                self.frames_captured += 1
+                self.condition.notify()
+
+    def read(self, timeout=None):
+        """
+        Return (ret, frame) like cv2.VideoCapture.read, using the newest captured frame.
+        Blocks until a frame arrives, the source fails, or `timeout` seconds pass.
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: self.buffer or self.failed, timeout)
+            if not self.buffer:
+                return False, None
+
+            # Anything older than the newest frame is stale by now
+            while len(self.buffer) > 1:
+                self.buffer.popleft()
+                self.frames_dropped += 1
+            captured_at, frame = self.buffer.popleft()
+
+        self.last_latency = time.time() - captured_at
+        return True, frame
+
+    def stats(self):
+        """Return capture counters and the last capture-to-process latency."""
+        return {
+            "captured": self.frames_captured,
+            "dropped": self.frames_dropped,
+            "latency_ms": self.last_latency * 1000.0,
+        }
+
+    def stop(self):
+        """Stop the capture thread (the VideoCapture itself is released by the owner)."""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
@@ -0,0 +1,150 @@
+import cv2
+import os
+import threading
+from collections import deque
+from datetime import datetime
+
+# Backpressure policies used when the queue is full
+POLICY_BLOCK = "block"        # Wait for a free slot (never loses frames, may stall the caller)
+POLICY_DROP = "drop"          # Discard the new frame
+POLICY_COALESCE = "coalesce"  # Write the new frame under a pending one of the same category (else drop)
+
+
+class FrameWriter:
+    """
+    Encode and write frames to disk on a pool of background threads.
+
+    `submit` only copies the frame and queues it, so JPEG encoding and disk
+    stalls never show up as dropped frames in the detection loop.
+
+    on_saved(path) / on_error(path) are called from the worker threads after
+    each write (e.g. for disk usage accounting).
+    """
+
+    def __init__(self, num_workers=2, max_queue=64, policy=POLICY_COALESCE, jpeg_quality=90,
+                 on_saved=None, on_error=None):
+        if policy not in (POLICY_BLOCK, POLICY_DROP, POLICY_COALESCE):
+            raise ValueError("Unknown backpressure policy", policy)
+
+        self.num_workers = num_workers
+        self.max_queue = max_queue
+        self.policy = policy
+        self.encode_params = [int(cv2.IMWRITE_JPEG_QUALITY), jpeg_quality]
+        self.on_saved = on_saved
+        self.on_error = on_error
+
+        self.pending = deque()
+        self.condition = threading.Condition()
+        self.in_progress = 0
+
+        self.frames_written = 0
+        self.frames_dropped = 0
+        self.frames_coalesced = 0
+        self.write_errors = 0
+
+        self._closed = False
+        self._workers = []
+
+    def start(self):
+        """Start the worker threads (called automatically on first submit). A closed writer stays closed."""
+        with self.condition:
+            if self._workers or self._closed:
+                return self
+            for _ in range(self.num_workers):
+                worker = threading.Thread(target=self._worker_loop, daemon=True)
+                worker.start()
+                self._workers.append(worker)
+        return self
+
+    def submit(self, frame, folder, prefix):
+        """Queue a frame for saving. Returns the path it will be written to, or None if it was dropped."""
+        if not self._workers and not self._closed:
+            self.start()
+
+        # The filename reflects when the frame was seen, not when it hit the disk
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]  # High precision
+        filename = os.path.join(folder, f"{prefix}_{timestamp}.jpg")
+        # Callers put the camera in the prefix, so frames only coalesce within one source and category
+        key = (folder, prefix)
+
+        with self.condition:
+            if self._closed:
+                return None
+
+            # Backpressure only applies once the queue is full
+            if len(self.pending) >= self.max_queue:
+                if self.policy == POLICY_BLOCK:
+                    self.condition.wait_for(lambda: len(self.pending) < self.max_queue or self._closed)
+                    if self._closed:
+                        return None
+                else:
+                    if self.policy == POLICY_COALESCE:
+                        for job in self.pending:
+                            if job[0] == key:
+                                # Only the newest frame of a category is worth writing; it takes
+                                # the pending name, which was already handed out to the caller
+                                job[2] = frame.copy()
+                                self.frames_coalesced += 1
+                                return job[1]
+                    self.frames_dropped += 1
+                    return None
+
+            # Copy, since callers keep drawing on the frame after saving it
+            self.pending.append([key, filename, frame.copy()])
+            self.condition.notify_all()
+        return filename
+
+    def _worker_loop(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.pending or self._closed)
+                if not self.pending:
+                    return
+                _, filename, frame = self.pending.popleft()
+                self.in_progress += 1
+                self.condition.notify_all()
+
+            written = self._write(filename, frame)
+
+            with self.condition:
+                if written:
+                    self.frames_written += 1
+                else:
+                    self.write_errors += 1
+                self.in_progress -= 1
+                self.condition.notify_all()
+
+    def _write(self, filename, frame):
+        try:
+            success, encoded = cv2.imencode(".jpg", frame, self.encode_params)
+            if not success:
+                raise ValueError("JPEG encoding failed")
+            with open(filename, "wb") as f:
+                f.write(encoded.tobytes())
+            print(f"[{datetime.now()}] Frame saved: {filename}")
+            if self.on_saved is not None:
+                self.on_saved(filename)
+            return True
+        except Exception as e:
+            print(f"[{datetime.now()}] Failed to save frame {filename}: {e}")
+            if self.on_error is not None:
+                self.on_error(filename)
+            return False
+
+    def flush(self, timeout=None):
+        """Wait until every queued frame has been written. Returns False on timeout."""
+        with self.condition:
+            return self.condition.wait_for(lambda: not self.pending and self.in_progress == 0, timeout)
+
+    def close(self, timeout=10.0):
+        """Flush the queue and stop the workers."""
+        flushed = self.flush(timeout)
+        with self.condition:
+            self._closed = True
+            self.condition.notify_all()
+        for worker in self._workers:
+            worker.join(timeout=2.0)
+        self._workers = []
+        print(f"[INFO] Frame writer closed. Written: {self.frames_written}, dropped: {self.frames_dropped}, "
+              f"coalesced: {self.frames_coalesced}, errors: {self.write_errors}")
+        return flushed
@@ -0,0 +1,45 @@
+import cv2
+import numpy as np
+
+
+class MotionAnalyzer:
+    """
+    MOG2 background subtraction at a configurable analysis resolution.
+
+    Frames are downscaled to `analysis_width` (and optionally converted to
+    grayscale) before the subtractor, threshold and findContours run. Contour
+    areas are rescaled, so `min_area` keeps its full-resolution meaning, and
+    the returned contours are in full-frame coordinates.
+    """
+
+    def __init__(self, history=500, var_threshold=10, min_area=500, analysis_width=None, grayscale=False):
+        self.subtractor = cv2.createBackgroundSubtractorMOG2(
+            history=history,
+            varThreshold=var_threshold
+        )
+        self.min_area = min_area
+        self.analysis_width = analysis_width  # None analyzes at full resolution
+        self.grayscale = grayscale
+
+    def apply(self, frame):
+        """Return (significant_motion, contours) for a BGR frame."""
+        frame_w = frame.shape[1]
+        scale = 1.0
+        small = frame
+        if self.analysis_width and frame_w > self.analysis_width:
+            scale = self.analysis_width / frame_w
+            small = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        if self.grayscale:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+        motion_mask = self.subtractor.apply(small)
+        _, motion_thresh = cv2.threshold(motion_mask, 127, 255, cv2.THRESH_BINARY)
+        motion_contours, _ = cv2.findContours(motion_thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+        # An area of `min_area` full-resolution pixels covers scale^2 as many analysis pixels
+        scaled_min_area = self.min_area * scale * scale
+        significant_motion = any(cv2.contourArea(c) > scaled_min_area for c in motion_contours)
+
+        if scale != 1.0:
+            motion_contours = [np.round(c / scale).astype(np.int32) for c in motion_contours]
+        return significant_motion, motion_contours
@@ -0,0 +1,66 @@
+import threading
+from datetime import datetime
+from tts_engines import SAMPLE_RATE, CHANNELS, SAMPLE_WIDTH
+
+
+def timestamp_fragments(prefix, detection_time):
+    """
+    Split an announcement like "Pessoa detectada às 14 horas, 03 minutos e 22 segundos."
+    into fixed fragments and numbers, each of which can be rendered once and reused.
+    """
+    return [
+        prefix,
+        f"{detection_time.hour:02d}", "horas,",
+        f"{detection_time.minute:02d}", "minutos e",
+        f"{detection_time.second:02d}", "segundos.",
+    ]
+
+
+class PhraseAssembler:
+    """
+    Build timestamped announcements by concatenating pre-rendered clips in memory.
+
+    get_clip(text, lang, speed) must return the PCM of a clip in the common format
+    (e.g. tts_player.get_speech_pcm). Clips are kept in memory once loaded, so any
+    announcement is assembled in milliseconds without synthesis or file access.
+    """
+
+    FIXED_FRAGMENTS = ("horas,", "minutos e", "segundos.")
+
+    def __init__(self, get_clip, lang="pt-br", gap_ms=60):
+        self.get_clip = get_clip
+        self.lang = lang
+        self.gap = b"\0" * (int(SAMPLE_RATE * gap_ms / 1000) * CHANNELS * SAMPLE_WIDTH)
+        self.pcm_cache = {}
+        self.lock = threading.Lock()
+
+    def clip_pcm(self, text, speed):
+        """PCM for one fragment, rendering it on first use."""
+        key = (text, speed)
+        with self.lock:
+            pcm = self.pcm_cache.get(key)
+        if pcm is None:
+            pcm = self.get_clip(text, self.lang, speed)
+            with self.lock:
+                self.pcm_cache[key] = pcm
+        return pcm
+
+    def prerender(self, prefixes, speed):
+        """Render the given prefixes, the fixed fragments and the numbers 00-59."""
+        fragments = list(prefixes) + list(self.FIXED_FRAGMENTS) + [f"{n:02d}" for n in range(60)]
+        for text in fragments:
+            try:
+                self.clip_pcm(text, speed)
+            except Exception as e:
+                print(f"[{datetime.now()}] Could not pre-render '{text}': {e}")
+                return False
+        print(f"[{datetime.now()}] Pre-rendered {len(fragments)} announcement fragments.")
+        return True
+
+    def assemble(self, fragments, speed):
+        """Concatenate the fragments' PCM with a short gap between them."""
+        return self.gap.join(self.clip_pcm(text, speed) for text in fragments)
+
+    def announcement(self, prefix, detection_time, speed):
+        """PCM for "<prefix> HH horas, MM minutos e SS segundos."."""
+        return self.assemble(timestamp_fragments(prefix, detection_time), speed)
@@ -0,0 +1,747 @@
+import cv2
+import time
+import os
+import re
+import threading
+from collections import namedtuple
+from datetime import datetime
+from ultralytics import YOLO
+from frame_grabber import FrameGrabber
+from frame_writer import FrameWriter, POLICY_COALESCE
+from event_recorder import EventRecorder
+from event_journal import EventJournal
+from event_index import EventIndex
+from retention import Category, ClipSubjects, RetentionManager
+from roi import merge_motion_rois, crop_rois, group_rois_by_size
+from motion_analysis import MotionAnalyzer
+from detections import Detections, build_class_mask, extract_detections, resolve_class_ids
+from adaptive_scheduler import AdaptiveScheduler
+from tracker import MultiObjectTracker, EVENT_NEW, EVENT_DWELL, EVENT_LOST
+from tts_player import play_gtts_text, play_timed_announcement, warm_up_announcements, close_audio
+from audio_output import PRIORITY_MOTION, PRIORITY_ANIMAL, PRIORITY_PERSON
+
+# Base directory is the current working directory
+BASE_DIR = os.getcwd()
+
+# Directories for saving frames and logs
+MOTION_FRAMES_DIR = os.path.join(BASE_DIR, "motion_frames_detected")
+PERSON_FRAMES_DIR = os.path.join(BASE_DIR, "person_frames_detected")
+EVENT_LOGS_DIR = os.path.join(BASE_DIR, "logs", "events")
+EVENT_INDEX_PATH = os.path.join(BASE_DIR, "logs", "events.db")
+# One video clip (plus JSON index) per event
+EVENT_CLIPS_DIR = os.path.join(BASE_DIR, "event_clips")
+
+# Ensure the directories exist
+os.makedirs(MOTION_FRAMES_DIR, exist_ok=True)
+os.makedirs(PERSON_FRAMES_DIR, exist_ok=True)
+os.makedirs(EVENT_LOGS_DIR, exist_ok=True)
+os.makedirs(EVENT_CLIPS_DIR, exist_ok=True)
+
+# YOLO model for person detection, shared by every pipeline in the process
+model = YOLO('yolov8n.pt')
+allowed_labels = {"person", "cat", "dog"}  # Include pets
+# Class-id lookup table, so results are filtered without a per-box label lookup
+allowed_class_mask = build_class_mask(model.names, allowed_labels)
+# Class ids passed to the model, so NMS and postprocessing only handle these classes
+allowed_class_ids = resolve_class_ids(model.names, allowed_labels)
+
+# Default detection thresholds (the ultralytics defaults)
+CONF_THRESHOLD = 0.25
+IOU_THRESHOLD = 0.7
+
+# Minimum seconds between saved frames of the same category (5 frames a second)
+SAVE_INTERVAL = 0.2
+
+# Inference size of the model; ROI crops run at smaller, stride-aligned sizes
+MODEL_IMGSZ = 640
+MODEL_STRIDE = 32
+
+def run_model(source, conf=CONF_THRESHOLD, iou=IOU_THRESHOLD, imgsz=MODEL_IMGSZ):
+    """Run YOLO on a frame or a list of frames, restricted to the allowed classes."""
+    return model(source, classes=allowed_class_ids, conf=conf, iou=iou, imgsz=imgsz)
+
+def run_model_on_rois(frame, rois, conf=CONF_THRESHOLD, iou=IOU_THRESHOLD):
+    """
+    Run YOLO on crops of the frame, each batch at the size of its crops, so small
+    regions cost less than a full frame. Returns (results, offsets) in matching order.
+    """
+    crops, offsets = crop_rois(frame, rois)
+    all_results, all_offsets = [], []
+    for imgsz, indices in group_rois_by_size(rois, MODEL_STRIDE, MODEL_IMGSZ).items():
+        all_results.extend(run_model([crops[i] for i in indices], conf, iou, imgsz))
+        all_offsets.extend(offsets[i] for i in indices)
+    return all_results, all_offsets
+
+# Disk quotas: person/pet artifacts are kept longer than motion-only ones, and
+# under disk pressure motion goes first (lowest priority)
+DAY = 24 * 3600
+GB = 1024 ** 3
+
+# SQLite index of the event journal, kept as long as the journal itself
+event_index = EventIndex(EVENT_INDEX_PATH, max_age=365 * DAY)
+
+def on_evicted(paths):
+    """Unlink index records from the frames and clips retention just deleted."""
+    event_index.forget_frames(os.path.basename(path) for path in paths)
+
+retention_manager = RetentionManager(
+    [
+        Category("motion_frames", MOTION_FRAMES_DIR, priority=0, max_bytes=2 * GB, max_age=7 * DAY),
+        Category("person_frames", PERSON_FRAMES_DIR, priority=2, max_bytes=2 * GB, max_age=30 * DAY),
+        Category("person_clips", EVENT_CLIPS_DIR, priority=2, max_bytes=20 * GB, max_age=30 * DAY,
+                 match=ClipSubjects(), companions=(".json", ".mp4")),
+        Category("motion_clips", EVENT_CLIPS_DIR, priority=1, max_bytes=10 * GB, max_age=7 * DAY,
+                 companions=(".json", ".mp4")),
+        Category("event_logs", EVENT_LOGS_DIR, priority=3, max_bytes=1 * GB, max_age=365 * DAY),
+    ],
+    min_free_bytes=1 * GB,
+    disk_path=BASE_DIR,
+    on_evicted=on_evicted,
+)
+
+def on_write_error(path):
+    """A failed write is most likely a full disk: run a retention pass right away."""
+    retention_manager.wake()
+
+# Background writer so JPEG encoding and disk I/O never stall the detection loop
+frame_writer = FrameWriter(num_workers=2, max_queue=64, policy=POLICY_COALESCE,
+                           on_saved=retention_manager.note_file, on_error=on_write_error)
+
+def save_frame(frame, folder, prefix):
+    """
+    Queue a frame to be saved to the specified folder with a timestamped filename.
+    Returns the file name (for references from the journal), or None if it was dropped.
+    """
+    filename = frame_writer.submit(frame, folder, prefix)
+    if filename is None:
+        print(f"[{datetime.now()}] Frame dropped (writer queue full): {prefix}")
+        return None
+    return os.path.basename(filename)
+
+# Append-only JSONL journal of every detection and event, written in the background
+# and indexed in SQLite for queries (see event_index.py)
+event_journal = EventJournal(EVENT_LOGS_DIR, index=event_index, on_saved=retention_manager.note_file)
+
+def log_event(kind, camera, timestamp, label=None, confidence=None, bbox=None, track_id=None, frame=None, **extra):
+    """Queue one journal record; never blocks the caller."""
+    record = {
+        "time": timestamp,
+        "kind": kind,
+        "camera": camera,
+        "label": label,
+        "confidence": round(confidence, 3) if confidence is not None else None,
+        "bbox": list(bbox) if bbox is not None else None,
+        "track_id": track_id,
+        "frame": frame,
+    }
+    record.update(extra)
+    if not event_journal.append(record):
+        print(f"[{datetime.now()}] Event record dropped (journal queue full): {kind}")
+
+def shutdown():
+    """Flush shared resources (queued frames, pending alerts) before the process exits."""
+    # Make sure every queued frame reaches the disk before exiting
+    frame_writer.close()
+    event_journal.close()
+    if event_journal.index is not None:
+        event_journal.index.close()
+    retention_manager.stop()
+    close_audio()
+
+class DetectionPipeline:
+    """
+    Detection pipeline for one video source, shared by the headless runner and the Tk app.
+
+    Stages, in order, for every frame:
+    capture -> motion -> inference -> tracking -> alerting -> render -> persistence -> journal -> schedule
+    """
+
+    def __init__(self, video_source=0, name=None, threaded_capture=True, capture_buffer_size=1, frame_skip=5,
+                 latency_budget=None,
+                 var_threshold=10, motion_analysis_width=None, motion_grayscale=False,
+                 motion_gated=False, gate_heartbeat=30.0, gate_hysteresis=3.0, roi_inference=False,
+                 conf_threshold=CONF_THRESHOLD, iou_threshold=IOU_THRESHOLD,
+                 tracking=True, track_max_misses=2, track_min_hits=1, dwell_time=60.0,
+                 event_clips=True, pre_roll=3.0, post_roll=5.0,
+                 person_cooldown=3, animal_alerts=True, animal_cooldown=3, announcement_speed=1.71,
+                 motion_cooldown=10, motion_speed=2.22, motion_announce_time=False):
+        self.name = name if name is not None else str(video_source)
+        # Filesystem-safe camera name, part of every saved file name so sources never mix
+        self.camera_tag = re.sub(r"[^A-Za-z0-9_.-]", "_", self.name)
+
+        # -----------------------------
+        # Capture
+        # -----------------------------
+        # Open video source (webcam or file)
+        self.vid = cv2.VideoCapture(video_source)
+        if not self.vid.isOpened():
+            raise ValueError("Unable to open video source", video_source)
+
+        # Read frames on a background thread so slow stages never work on stale frames
+        self.grabber = None
+        if threaded_capture:
+            self.grabber = FrameGrabber(self.vid, buffer_size=capture_buffer_size)
+
+        # -----------------------------
+        # Motion
+        # -----------------------------
+        # Background subtractor (optionally downscaled/grayscale; areas are rescaled
+        # so the 500 px threshold holds)
+        self.motion_detector = MotionAnalyzer(
+            history=500,
+            var_threshold=var_threshold,
+            min_area=500,
+            analysis_width=motion_analysis_width,
+            grayscale=motion_grayscale
+        )
+        self.motion_enabled = True
+        self.motion_disabled_until = 0
+        self.motion_contours = []
+        self.significant_motion = False
+        self._motion_frame = -1  # frame_count the motion stage last ran for
+
+        # Motion gating: only run YOLO while MOG2 reports activity (plus `gate_hysteresis`
+        # seconds after it ends), and at least once every `gate_heartbeat` seconds
+        self.motion_gated = motion_gated
+        self.gate_heartbeat = gate_heartbeat
+        self.gate_hysteresis = gate_hysteresis
+        self.last_activity_time = 0
+
+        # ROI mode: run YOLO on padded crops around the motion instead of the full frame
+        self.roi_inference = roi_inference
+        self.motion_rois = []
+
+        # -----------------------------
+        # Inference
+        # -----------------------------
+        # If your machine can handle it, you can set frame_skip=1 to run YOLO every frame,
+        # or give a latency_budget (seconds) to have it chosen from measured timings
+        self.frame_skip = frame_skip
+        self.frame_count = 0
+        self.next_inference_frame = 0  # frame_count at which the next inference slot comes up
+        self.scheduler = None
+        if latency_budget is not None:
+            self.scheduler = AdaptiveScheduler(latency_budget, initial_skip=frame_skip)
+            # Nominal camera rate until the capture thread has measured the real one
+            fps = self.vid.get(cv2.CAP_PROP_FPS)
+            if fps and fps > 0:
+                self.scheduler.record_capture_interval(1.0 / fps)
+        self._captured_mark = (0, None)  # (frames captured, time) at the last capture-rate sample
+        self.conf_threshold = conf_threshold
+        self.iou_threshold = iou_threshold
+        self.last_inference_time = 0
+        self.model_seconds = 0.0  # time spent in the model during the current frame
+        self.inferences_run = 0
+        self.inferences_skipped = 0
+
+        # -----------------------------
+        # Tracking
+        # -----------------------------
+        # Array-backed YOLO detections kept between inferences
+        self.persistent_detections = Detections.empty(model.names)
+        # Tracker that gives detections stable ids and moves their boxes on frames
+        # without inference; tracks missed by more than `track_max_misses` inferences
+        # in a row are dropped.
+        # Its lifecycle events (new / dwell / lost) drive alerting and persistence.
+        self.tracker = None
+        if tracking:
+            self.tracker = MultiObjectTracker(model.names, max_misses=track_max_misses, min_hits=track_min_hits,
+                                              dwell_time=dwell_time)
+        self.track_events = []
+
+        # -----------------------------
+        # Alerting
+        # -----------------------------
+        self.person_cooldown = person_cooldown
+        self.animal_alerts = animal_alerts
+        self.animal_cooldown = animal_cooldown
+        self.announcement_speed = announcement_speed
+        self.motion_cooldown = motion_cooldown
+        self.motion_speed = motion_speed
+        # Announce the time of motion ("Movimento detectado às ...") or just "Movimento detectado!"
+        self.motion_announce_time = motion_announce_time
+
+        # -----------------------------
+        # Persistence
+        # -----------------------------
+        # Track last saved times to avoid saving too many frames
+        self.last_saved_times = {
+            "motion": 0,
+            "person": 0
+        }
+        # Event clips replace the continuous JPEG saving of motion (and, without the
+        # tracker, of people/pets)
+        self.recorder = None
+        if event_clips:
+            self.recorder = EventRecorder(EVENT_CLIPS_DIR, self.camera_tag, pre_roll=pre_roll, post_roll=post_roll,
+                                          on_saved=retention_manager.note_file)
+        # Journal: motion is logged when it starts, detections on every inference
+        self._motion_logged = False
+        # Best (highest-confidence) annotated frame of each live track:
+        # {track_id: (confidence, frame, file name once saved)}
+        self.best_frames = {}
+        # Stills the journal records of the current frame refer to:
+        # {"person" / "motion" / track_id: file name}
+        self.frame_stills = {}
+
+    def start(self):
+        """Start the capture thread and pre-render this pipeline's announcements."""
+        if self.grabber is not None:
+            self.grabber.start()
+        # Shared by every pipeline; starting it again is a no-op
+        retention_manager.start()
+        prefixes = ["Pessoa detectada às"]
+        if self.animal_alerts:
+            prefixes.append("Animal detectado às")
+        warm_up_announcements(prefixes, self.announcement_speed)
+        if self.motion_announce_time:
+            warm_up_announcements(["Movimento detectado às"], self.motion_speed)
+
+    # ---------------------------------------------------------------------
+    # Capture
+    # ---------------------------------------------------------------------
+    def read_frame(self, timeout=None):
+        """Return (ret, frame) from the capture thread or directly from the source."""
+        if self.grabber is not None:
+            return self.grabber.read(timeout)
+        return self.vid.read()
+
+    # ---------------------------------------------------------------------
+    # Motion
+    # ---------------------------------------------------------------------
+    def motion_stage(self, frame, current_time):
+        """
+        Run the background subtractor on the frame, when anything needs it: motion
+        alerts, the motion gate or ROI inference. Records activity for the gate and
+        computes the regions of interest. Returns True on significant motion.
+        """
+        self._motion_frame = self.frame_count
+        if not (self.motion_enabled or self.motion_gated or self.roi_inference):
+            self.significant_motion = False
+            return False
+
+        self.significant_motion, self.motion_contours = self.motion_detector.apply(frame)
+        if self.significant_motion:
+            self.last_activity_time = current_time
+        if self.roi_inference:
+            self.motion_rois = merge_motion_rois(
+                self.motion_contours,
+                frame.shape,
+                extra_boxes=self.persistent_detections.xyxy,
+            )
+        return self.significant_motion
+
+    # ---------------------------------------------------------------------
+    # Inference
+    # ---------------------------------------------------------------------
+    def scene_active(self, current_time):
+        """True while there is recent motion or something is in view (even standing still)."""
+        return (current_time - self.last_activity_time <= self.gate_hysteresis
+                or bool(self.persistent_detections))
+
+    def needs_inference(self, current_time=None):
+        """True if YOLO should run on the current frame."""
+        if self.frame_count < self.next_inference_frame:
+            return False
+        if not self.motion_gated:
+            return True
+
+        if current_time is None:
+            current_time = time.time()
+        heartbeat_due = current_time - self.last_inference_time >= self.gate_heartbeat
+        return self.scene_active(current_time) or heartbeat_due
+
+    def wants_own_batch(self):
+        """True if this frame's inference runs on ROI crops, so it can't join a full-frame batch."""
+        return self.roi_inference and bool(self.motion_rois)
+
+    def inference_stage(self, frame, current_time, results=None):
+        """
+        Run YOLO if it is due and return fresh detections, or None if it didn't run.
+        results: YOLO results for this frame, if the caller already ran the model
+                 (e.g. as part of a batch).
+        """
+        slot = self.frame_count >= self.next_inference_frame
+        due = self.needs_inference(current_time)
+        if slot:
+            self.next_inference_frame = self.frame_count + self.frame_skip
+        if not due:
+            if slot:
+                self.inferences_skipped += 1
+            return None
+
+        # Offsets map boxes found in ROI crops back to full-frame coordinates
+        offsets = None
+        if results is None:
+            started = time.perf_counter()
+            if self.wants_own_batch():
+                results, offsets = run_model_on_rois(frame, self.motion_rois, self.conf_threshold,
+                                                     self.iou_threshold)
+            else:
+                results = run_model(frame, self.conf_threshold, self.iou_threshold)
+            self.model_seconds = time.perf_counter() - started
+            self.record_inference_time(self.model_seconds)
+        self.inferences_run += 1
+        self.last_inference_time = current_time
+        return extract_detections(results, allowed_class_mask, model.names, offsets)
+
+    def record_inference_time(self, seconds):
+        """Feed a model call's duration to the adaptive scheduler (callers batching sources do this too)."""
+        if self.scheduler is not None:
+            self.scheduler.record_inference_time(seconds)
+
+    def schedule_stage(self, current_time, frame_seconds):
+        """
+        Let the adaptive scheduler pick the frame_skip for the next frames.
+        frame_seconds: time spent on this frame outside the model, measured on
+        every frame (with frame_skip=1, every frame runs inference).
+        """
+        if self.scheduler is None:
+            return
+        self.scheduler.record_frame_time(frame_seconds)
+
+        # Capture rate, sampled about once a second from the capture thread's counter
+        if self.grabber is not None:
+            captured = self.grabber.frames_captured
+            last_captured, last_time = self._captured_mark
+            if last_time is None:
+                self._captured_mark = (captured, current_time)
+            elif current_time - last_time >= 1.0:
+                if captured > last_captured:
+                    self.scheduler.record_capture_interval((current_time - last_time) / (captured - last_captured))
+                self._captured_mark = (captured, current_time)
+
+        new_skip = self.scheduler.update(self.scene_active(current_time))
+        if new_skip < self.frame_skip:
+            # Don't wait out the rest of a long idle interval once activity starts
+            self.next_inference_frame = min(self.next_inference_frame, self.frame_count + new_skip)
+        self.frame_skip = new_skip
+
+    # ---------------------------------------------------------------------
+    # Tracking
+    # ---------------------------------------------------------------------
+    def tracking_stage(self, frame, current_time, fresh_detections):
+        """
+        Associate fresh detections with tracks, or predict where the tracks moved
+        on frames without inference. Without a tracker, the latest detections are
+        just kept between inferences (so boxes don't blink).
+        """
+        if self.tracker is None:
+            if fresh_detections is not None:
+                self.persistent_detections = fresh_detections
+        elif fresh_detections is not None:
+            self.persistent_detections = self.tracker.update(fresh_detections, current_time)
+        else:
+            self.persistent_detections = self.tracker.predict(current_time)
+
+        if self.tracker is not None:
+            self.track_events = self.tracker.pop_events()
+            for event in self.track_events:
+                print(f"[{datetime.now()}] [{self.name}] Track {event.track_id} ({event.label}) {event.kind}, "
+                      f"{event.dwell:.0f}s in view")
+        return self.persistent_detections
+
+    # ---------------------------------------------------------------------
+    # Alerting
+    # ---------------------------------------------------------------------
+    def alert_stage(self, current_time, fresh_detections):
+        """
+        Announce people/pets and motion while motion alerts are enabled.
+        With the tracker, people/pets are announced once per new track; without
+        it, on every inference that finds them (limited by the cooldowns).
+        """
+        if self.tracker is not None:
+            self.track_alerts(current_time)
+        elif fresh_detections:
+            # Announcements are assembled from pre-rendered fragments (see start)
+            detection_time = datetime.now()
+            for detection in fresh_detections:
+                if detection.label == 'person':
+                    play_timed_announcement("Pessoa detectada às", detection_time, cooldown=self.person_cooldown,
+                                            speed=self.announcement_speed, priority=PRIORITY_PERSON,
+                                            category="person", camera=self.name)
+                    # Disable motion alerts for 20s if a person is found
+                    self.motion_enabled = False
+                    self.motion_disabled_until = current_time + 20
+                    break
+                elif detection.label in {'cat', 'dog'} and self.animal_alerts:
+                    play_timed_announcement("Animal detectado às", detection_time, cooldown=self.animal_cooldown,
+                                            speed=self.announcement_speed, priority=PRIORITY_ANIMAL,
+                                            category="animal", camera=self.name)
+                    break
+
+        if self.motion_enabled:
+            if self.significant_motion:
+                if self.motion_announce_time:
+                    play_timed_announcement("Movimento detectado às", datetime.now(), cooldown=self.motion_cooldown,
+                                            speed=self.motion_speed, priority=PRIORITY_MOTION,
+                                            category="motion", camera=self.name)
+                else:
+                    play_gtts_text("Movimento detectado!", cooldown=self.motion_cooldown, speed=self.motion_speed,
+                                   priority=PRIORITY_MOTION, category="motion", camera=self.name)
+        elif current_time >= self.motion_disabled_until:
+            # Check if we can re-enable motion detection
+            self.motion_enabled = True
+
+    def track_alerts(self, current_time):
+        """Announce new person/pet tracks; motion alerts stay off while a person is in view."""
+        detection_time = datetime.now()
+        for event in self.track_events:
+            if event.kind != EVENT_NEW:
+                continue
+            if event.label == 'person':
+                play_timed_announcement("Pessoa detectada às", detection_time, cooldown=self.person_cooldown,
+                                        speed=self.announcement_speed, priority=PRIORITY_PERSON,
+                                        category="person", camera=self.name)
+                break
+            elif event.label in {'cat', 'dog'} and self.animal_alerts:
+                play_timed_announcement("Animal detectado às", detection_time, cooldown=self.animal_cooldown,
+                                        speed=self.announcement_speed, priority=PRIORITY_ANIMAL,
+                                        category="animal", camera=self.name)
+                break
+
+        # A person moving around is not "motion"; keep motion alerts off until 20s after they leave
+        if any(detection.label == 'person' for detection in self.persistent_detections):
+            self.motion_enabled = False
+            self.motion_disabled_until = current_time + 20
+
+    # ---------------------------------------------------------------------
+    # Render
+    # ---------------------------------------------------------------------
+    def render_stage(self, frame):
+        """Draw the current detections directly on `frame`."""
+        for detection in self.persistent_detections:
+            x_min, y_min, x_max, y_max = detection.bbox
+            color = (0, 255, 0)
+            cv2.rectangle(frame, (x_min, y_min), (x_max, y_max), color, 2)
+            caption = f"{detection.label} {detection.confidence:.2f}"
+            if detection.track_id is not None:
+                caption = f"{detection.label} #{detection.track_id} {detection.confidence:.2f}"
+            cv2.putText(
+                frame,
+                caption,
+                (x_min, y_min - 10),
+                cv2.FONT_HERSHEY_SIMPLEX,
+                0.5,
+                color,
+                2
+            )
+        return frame
+
+    # ---------------------------------------------------------------------
+    # Persistence
+    # ---------------------------------------------------------------------
+    def persistence_stage(self, frame, current_time):
+        """
+        Save annotated frames of people/pets and of motion, at most every SAVE_INTERVAL seconds each.
+        With the tracker, people/pets are saved per track event instead of continuously.
+        With event clips, motion and people/pets are recorded as video instead, and
+        only the per-track frames are still saved as JPEGs.
+        """
+        self.frame_stills = {}
+        if self.tracker is not None:
+            self.track_persistence(frame)
+
+        if self.recorder is not None:
+            self.record_stage(frame, current_time)
+            return
+
+        if self.tracker is None and self.persistent_detections and (
+                current_time - self.last_saved_times["person"] >= SAVE_INTERVAL):
+            self.frame_stills["person"] = save_frame(frame, PERSON_FRAMES_DIR, f"{self.camera_tag}_person_pet")
+            self.last_saved_times["person"] = current_time
+
+        if (self.motion_enabled and self.significant_motion
+                and current_time - self.last_saved_times["motion"] >= SAVE_INTERVAL):
+            self.frame_stills["motion"] = save_frame(frame, MOTION_FRAMES_DIR, f"{self.camera_tag}_motion")
+            self.last_saved_times["motion"] = current_time
+
+    def record_stage(self, frame, current_time):
+        """Keep the event clip going while there is motion or anything in view, then add the frame."""
+        if self.motion_enabled and self.significant_motion:
+            self.recorder.trigger(current_time, "motion")
+        for label in set(self.persistent_detections.labels):
+            self.recorder.trigger(current_time, label)
+        self.recorder.push(frame, current_time, self.persistent_detections)
+
+    def track_persistence(self, frame):
+        """
+        Keep the best frame of every track and save a handful per track: the first
+        one, the best one so far at each dwell event, and the best one when it's lost.
+        """
+        for detection in self.persistent_detections:
+            best = self.best_frames.get(detection.track_id)
+            if best is None or detection.confidence > best[0]:
+                # Confidence only changes on inference frames, so copies are rare
+                self.best_frames[detection.track_id] = (detection.confidence, frame.copy(), None)
+
+        for event in self.track_events:
+            prefix = f"{self.camera_tag}_{event.label}_track{event.track_id}_{event.kind}"
+            if event.kind == EVENT_NEW:
+                saved = save_frame(frame, PERSON_FRAMES_DIR, prefix)
+                if event.track_id in self.best_frames:
+                    confidence, best_frame, _ = self.best_frames[event.track_id]
+                    self.best_frames[event.track_id] = (confidence, best_frame, saved)
+            elif event.kind in (EVENT_DWELL, EVENT_LOST):
+                best = self.best_frames.get(event.track_id)
+                if best is None:
+                    continue
+                saved = best[2]
+                if saved is None:
+                    # Only save the best frame if it's a new one
+                    saved = save_frame(best[1], PERSON_FRAMES_DIR, prefix)
+                    self.best_frames[event.track_id] = (best[0], best[1], saved)
+            else:
+                continue
+            if saved is not None:
+                self.frame_stills[event.track_id] = saved
+
+        # Forget tracks that are gone (lost, or dropped before being confirmed)
+        if len(self.best_frames) > len(self.persistent_detections):
+            live = set(self.persistent_detections.track_id.tolist())
+            for track_id in list(self.best_frames):
+                if track_id not in live:
+                    del self.best_frames[track_id]
+
+    def journal_stage(self, current_time, fresh_detections):
+        """Log motion onsets, detections from this frame's inference and track events to the journal."""
+        # Records refer to the clip they were recorded in, if any, or else to a still saved of them
+        clip = None
+        if self.recorder is not None and self.recorder.recording:
+            clip = self.recorder.clip_name
+        stills = self.frame_stills
+
+        if self.significant_motion and not self._motion_logged:
+            log_event("motion", self.name, current_time, frame=clip or stills.get("motion"))
+        self._motion_logged = self.significant_motion
+
+        if fresh_detections is not None:
+            if self.tracker is None:
+                detections = fresh_detections
+            else:
+                # Tracked boxes of this inference (not the ones only predicted)
+                detections = [d for d in self.persistent_detections if d.track_id in self.tracker.updated_ids]
+            for detection in detections:
+                frame_ref = clip or stills.get(detection.track_id) or stills.get("person")
+                log_event("detection", self.name, current_time, detection.label, detection.confidence,
+                          detection.bbox, detection.track_id, frame_ref)
+
+        for event in self.track_events:
+            # A track event's own still shows it better than the clip
+            log_event(event.kind, self.name, event.timestamp, event.label, event.confidence, event.bbox,
+                      event.track_id, stills.get(event.track_id) or clip, dwell=round(event.dwell, 1))
+
+    # ---------------------------------------------------------------------
+    # All stages
+    # ---------------------------------------------------------------------
+    def process_frame(self, frame, current_time, results=None):
+        """
+        Run every stage after capture on one frame and return the annotated frame.
+        results: YOLO results for this frame, if the caller already ran the model.
+        """
+        # Motion runs on the raw frame, before boxes are drawn; a caller batching
+        # several pipelines may already have run it for this frame
+        started = time.perf_counter()
+        self.model_seconds = 0.0
+        if self._motion_frame != self.frame_count:
+            self.motion_stage(frame, current_time)
+
+        fresh_detections = self.inference_stage(frame, current_time, results)
+        self.tracking_stage(frame, current_time, fresh_detections)
+        self.alert_stage(current_time, fresh_detections)
+        self.render_stage(frame)
+        # After drawing boxes, so the images on disk show annotations
+        self.persistence_stage(frame, current_time)
+        self.journal_stage(current_time, fresh_detections)
+        self.schedule_stage(current_time, time.perf_counter() - started - self.model_seconds)
+
+        self.frame_count += 1
+        return frame
+
+    def release(self):
+        """Stop capturing, release the video source and print the pipeline's counters."""
+        if self.grabber is not None:
+            self.grabber.stop()
+            stats = self.grabber.stats()
+            print(f"[INFO] [{self.name}] Frames captured: {stats['captured']}, dropped: {stats['dropped']}, "
+                  f"last capture latency: {stats['latency_ms']:.1f} ms")
+        if self.motion_gated:
+            print(f"[INFO] [{self.name}] Inferences run: {self.inferences_run}, "
+                  f"skipped by motion gate: {self.inferences_skipped}")
+        if self.scheduler is not None:
+            print(f"[INFO] [{self.name}] Adaptive scheduler: {self.scheduler.stats()}")
+        if self.recorder is not None:
+            self.recorder.close()
+        self.vid.release()
+        print(f"[INFO] [{self.name}] Video source released.")
+
+# Output of one processed frame, as published by PipelineWorker
+PipelineResult = namedtuple("PipelineResult", ["seq", "frame", "detections", "timestamp"])
+
+class PipelineWorker:
+    """
+    Run a DetectionPipeline on its own thread and publish only the latest result.
+
+    Consumers (e.g. the Tk front-end) call latest() at their own pace; results
+    they don't pick up in time are simply replaced by newer ones.
+    """
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+        self.lock = threading.Lock()
+        self.result = None
+        self.seq = 0
+        self.failed = False
+        # Frames processed per second, measured over roughly one-second windows
+        self.fps = 0.0
+        self._fps_count = 0
+        self._fps_since = time.time()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self.pipeline.start()
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def _loop(self):
+        while self._running:
+            ret, frame = self.pipeline.read_frame(timeout=0.5)
+            if not ret:
+                if self.pipeline.grabber is None or self.pipeline.grabber.failed:
+                    print(f"[ERROR] [{self.pipeline.name}] Failed to read frame from source.")
+                    self.failed = True
+                    break
+                continue
+
+            current_time = time.time()
+            try:
+                frame = self.pipeline.process_frame(frame, current_time)
+            except Exception as e:
+                # Don't let the thread die silently: consumers watch `failed`
+                print(f"[ERROR] [{self.pipeline.name}] Frame processing failed: {e}")
+                self.failed = True
+                break
+            with self.lock:
+                self.seq += 1
+                self.result = PipelineResult(self.seq, frame, self.pipeline.persistent_detections, current_time)
+
+            self._fps_count += 1
+            elapsed = current_time - self._fps_since
+            if elapsed >= 1.0:
+                self.fps = self._fps_count / elapsed
+                self._fps_count = 0
+                self._fps_since = current_time
+
+    def latest(self):
+        """The most recent PipelineResult, or None before the first frame."""
+        with self.lock:
+            return self.result
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+            self._thread = None
@@ -0,0 +1,77 @@
+import threading
+import time
+from collections import namedtuple
+
+# Result of a rate-limit check; `reason` says why an alert was suppressed
+RateDecision = namedtuple("RateDecision", ["allowed", "key", "reason", "retry_after"])
+
+
+class TokenBucket:
+    """Classic token bucket: `capacity` tokens, refilled at `rate` tokens per second."""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = None
+
+    def _refill(self, now):
+        if self.updated is not None:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_consume(self, now):
+        """Take one token if available. Returns (allowed, seconds until the next token)."""
+        self._refill(now)
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True, 0.0
+        if self.rate <= 0:
+            return False, float("inf")
+        return False, (1.0 - self.tokens) / self.rate
+
+
+class AlertRateLimiter:
+    """
+    Per-key alert rate limiting with atomic check-and-consume.
+
+    Keys are (category, camera): "person", "animal" and "motion" alerts each have
+    their own bucket, per camera, so a motion alert can no longer silence a person
+    alert. A bucket is created on first use from the caller's cooldown
+    (one alert per `cooldown` seconds, with `burst` alerts allowed back to back).
+    Checks only do arithmetic under a lock, so they are safe to call from the frame loop.
+    """
+
+    def __init__(self, burst=1):
+        self.burst = burst
+        self.buckets = {}
+        self.lock = threading.Lock()
+        self.allowed = 0
+        self.suppressed = 0
+
+    def check(self, category, camera=None, cooldown=10.0, now=None):
+        """Consume a token for (category, camera) if one is available and return a RateDecision."""
+        if now is None:
+            now = time.monotonic()
+        key = (category, camera)
+        rate = 1.0 / cooldown if cooldown > 0 else float("inf")
+
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = TokenBucket(rate, self.burst)
+            elif bucket.rate != rate:
+                # Callers may change their cooldown; keep the tokens, update the refill rate
+                bucket._refill(now)
+                bucket.rate = rate
+
+            allowed, retry_after = bucket.try_consume(now)
+            if allowed:
+                self.allowed += 1
+            else:
+                self.suppressed += 1
+
+        if allowed:
+            return RateDecision(True, key, "allowed", 0.0)
+        where = f" on camera {camera}" if camera is not None else ""
+        return RateDecision(False, key, f"cooldown for '{category}'{where}, retry in {retry_after:.1f}s", retry_after)
@@ -0,0 +1,294 @@
+import heapq
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+
+
+class Category:
+    """
+    One class of artifacts with its own quota.
+
+    folder: where its files live (several categories may share a folder, with
+            `match` deciding which files belong to which).
+    priority: under disk pressure, lower priorities are evicted first.
+    max_bytes / max_age: per-category limits (None for no limit).
+    match: optional callable(path) -> bool.
+    companions: suffixes of files deleted together with a file (e.g. a clip's ".json").
+    """
+
+    def __init__(self, name, folder, priority=0, max_bytes=None, max_age=None, match=None, companions=()):
+        self.name = name
+        self.folder = os.path.abspath(folder)
+        self.priority = priority
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.match = match
+        self.companions = companions
+
+        # Incremental accounting: {path: (mtime, size)}, total bytes, and a
+        # min-heap of (mtime, path) with stale entries skipped lazily
+        self.files = {}
+        self.bytes = 0
+        self.heap = []
+
+    def owns(self, path):
+        if not path.startswith(self.folder + os.sep):
+            return False
+        return self.match is None or self.match(path)
+
+
+class ClipSubjects:
+    """
+    match= for event clips (and their sidecars) whose JSON sidecar lists one of
+    `labels` as a reason. Sidecars are written once, when the clip is closed, so
+    each clip's answer is cached instead of parsing the JSON on every note and rescan.
+    """
+
+    def __init__(self, labels=("person", "cat", "dog")):
+        self.labels = labels
+        self.cache = {}  # {clip path without extension: bool}
+
+    def __call__(self, path):
+        base = os.path.splitext(path)[0]
+        cached = self.cache.get(base)
+        if cached is not None:
+            return cached
+        try:
+            with open(base + ".json") as f:
+                reasons = json.load(f).get("reasons", [])
+        except (OSError, ValueError):
+            # Not written yet (or being written): don't cache the answer
+            return False
+        self.cache[base] = any(label in reasons for label in self.labels)
+        return self.cache[base]
+
+    def forget(self, path):
+        self.cache.pop(os.path.splitext(path)[0], None)
+
+
+class RetentionManager:
+    """
+    Background service that keeps detection artifacts within their quotas.
+
+    Usage is accounted incrementally: writers report every file they create
+    with note_file(), and a full directory walk only happens at start and
+    every `rescan_interval` seconds (to pick up files created or removed by
+    anything else). Each pass then:
+
+    - deletes files older than their category's max_age,
+    - deletes the oldest files of any category above its max_bytes,
+    - while the disk has less than `min_free_bytes` free, deletes the oldest
+      files of the lowest-priority category first, so e.g. motion frames go
+      long before person events.
+
+    on_evicted(paths): optional callback with the files deleted by a pass, e.g.
+    to drop index entries that refer to them.
+    """
+
+    def __init__(self, categories, interval=30.0, rescan_interval=3600.0, min_free_bytes=None, disk_path=None,
+                 on_evicted=None):
+        self.categories = categories
+        self.on_evicted = on_evicted
+        self.interval = interval
+        self.rescan_interval = rescan_interval
+        self.min_free_bytes = min_free_bytes
+        self.disk_path = disk_path or (categories[0].folder if categories else os.getcwd())
+
+        self.lock = threading.Lock()
+        self.files_deleted = 0
+        self.bytes_deleted = 0
+        self.last_rescan = 0
+
+        self._wake = threading.Event()
+        self._running = False
+        self._thread = None
+
+    # -----------------------------
+    # Accounting
+    # -----------------------------
+    def _category_of(self, path):
+        for category in self.categories:
+            if category.owns(path):
+                return category
+        return None
+
+    def note_file(self, path):
+        """Account for a file that was just written (or rewritten)."""
+        path = os.path.abspath(path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+        with self.lock:
+            self._add(path, stat.st_mtime, stat.st_size)
+
+    def _add(self, path, mtime, size):
+        # A file may move to another category (e.g. a clip once its sidecar exists)
+        for category in self.categories:
+            if path in category.files:
+                category.bytes -= category.files.pop(path)[1]
+        category = self._category_of(path)
+        if category is None:
+            return
+        category.files[path] = (mtime, size)
+        category.bytes += size
+        heapq.heappush(category.heap, (mtime, path))
+
+    def _forget(self, category, path):
+        entry = category.files.pop(path, None)
+        if entry is not None:
+            category.bytes -= entry[1]
+        forget = getattr(category.match, "forget", None)
+        if forget is not None:
+            forget(path)
+
+    def rescan(self):
+        """Rebuild the accounting from a full walk of every category's folder."""
+        found = []
+        for folder in {category.folder for category in self.categories}:
+            stack = [folder]
+            while stack:
+                try:
+                    entries = list(os.scandir(stack.pop()))
+                except FileNotFoundError:
+                    continue
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        stat = entry.stat()
+                        found.append((entry.path, stat.st_mtime, stat.st_size))
+
+        with self.lock:
+            for category in self.categories:
+                category.files, category.bytes, category.heap = {}, 0, []
+            for path, mtime, size in found:
+                self._add(path, mtime, size)
+            self.last_rescan = time.time()
+
+    def usage(self):
+        """{category name: (files, bytes)}"""
+        with self.lock:
+            return {category.name: (len(category.files), category.bytes) for category in self.categories}
+
+    # -----------------------------
+    # Eviction
+    # -----------------------------
+    def _oldest(self, category):
+        """(mtime, path) of the category's oldest live file, or None."""
+        while category.heap:
+            mtime, path = category.heap[0]
+            entry = category.files.get(path)
+            if entry is not None and entry[0] == mtime:
+                return mtime, path
+            heapq.heappop(category.heap)  # stale
+        return None
+
+    def _evict(self, category, path, evicted):
+        """Delete a file (and its companions), appending them to `evicted`. Returns the bytes freed."""
+        freed = 0
+        paths = [path]
+        for suffix in category.companions:
+            companion = os.path.splitext(path)[0] + suffix
+            if companion not in paths and os.path.exists(companion):
+                paths.append(companion)
+        for victim in paths:
+            owner = next((c for c in self.categories if victim in c.files), category)
+            size = owner.files.get(victim, (0, 0))[1]
+            try:
+                os.remove(victim)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                # Stop accounting for it (it's retried after the next rescan), or it
+                # would stay the oldest file forever
+                print(f"[{datetime.now()}] Could not delete {victim}: {e}")
+                self._forget(owner, victim)
+                continue
+            self._forget(owner, victim)
+            evicted.append(victim)
+            freed += size
+            self.files_deleted += 1
+        self.bytes_deleted += freed
+        return freed
+
+    def enforce(self, now=None):
+        """Run one retention pass. Returns the number of bytes freed."""
+        if now is None:
+            now = time.time()
+        freed = 0
+        evicted = []
+        with self.lock:
+            for category in self.categories:
+                while True:
+                    oldest = self._oldest(category)
+                    if oldest is None:
+                        break
+                    mtime, path = oldest
+                    too_old = category.max_age is not None and now - mtime > category.max_age
+                    too_big = category.max_bytes is not None and category.bytes > category.max_bytes
+                    if not (too_old or too_big):
+                        break
+                    freed += self._evict(category, path, evicted)
+                    if path in category.files:
+                        break  # No progress
+
+            if self.min_free_bytes is not None:
+                missing = self.min_free_bytes - shutil.disk_usage(self.disk_path).free
+                for category in sorted(self.categories, key=lambda c: c.priority):
+                    while missing > 0:
+                        oldest = self._oldest(category)
+                        if oldest is None:
+                            break
+                        released = self._evict(category, oldest[1], evicted)
+                        missing -= released
+                        freed += released
+                        if oldest[1] in category.files:
+                            break  # No progress
+                if missing > 0:
+                    print(f"[{datetime.now()}] Retention: disk still {missing} bytes short after eviction.")
+
+        if freed:
+            print(f"[{datetime.now()}] Retention freed {freed / (1024 * 1024):.1f} MB.")
+        if evicted and self.on_evicted is not None:
+            self.on_evicted(evicted)
+        return freed
+
+    # -----------------------------
+    # Background service
+    # -----------------------------
+    def start(self):
+        """Start the background thread (the first pass rescans everything)."""
+        if self._running:
+            return self
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def wake(self):
+        """Run a pass now (e.g. after a write failed for lack of space)."""
+        self._wake.set()
+
+    def _loop(self):
+        while self._running:
+            try:
+                if time.time() - self.last_rescan >= self.rescan_interval:
+                    self.rescan()
+                self.enforce()
+            except Exception as e:
+                print(f"[{datetime.now()}] Retention pass failed: {e}")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def stop(self):
+        self._running = False
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+            self._thread = None
+        print(f"[INFO] Retention stopped. Files deleted: {self.files_deleted}, "
+              f"freed: {self.bytes_deleted / (1024 * 1024):.1f} MB")
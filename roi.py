@@ -0,0 +1,95 @@
+import cv2
+
+
+def merge_motion_rois(contours, frame_shape, extra_boxes=(), min_area=500, padding=32, min_size=160,
+                      max_coverage=0.6):
+    """
+    Turn motion contours into a few padded, non-overlapping regions of interest.
+
+    contours: output of cv2.findContours on the motion mask.
+    frame_shape: shape of the full frame, used to clip the regions.
+    extra_boxes: other (x_min, y_min, x_max, y_max) boxes to cover, e.g. the previous
+                 detections, so a subject that stops moving is not lost.
+    min_area: contours smaller than this are ignored (same meaning as the motion threshold).
+    padding: pixels added around each contour so the whole subject fits in the crop.
+    min_size: regions are grown to at least this width/height to give the model some context.
+    max_coverage: if the regions cover more than this fraction of the frame, return []
+                  so the caller runs a single full-frame inference instead.
+
+    Returns a list of (x_min, y_min, x_max, y_max) tuples in full-frame coordinates.
+    """
+    frame_h, frame_w = frame_shape[:2]
+
+    boxes = []
+    for c in contours:
+        if cv2.contourArea(c) <= min_area:
+            continue
+        x, y, w, h = cv2.boundingRect(c)
+        boxes.append(_pad_box(x, y, x + w, y + h, padding, min_size, frame_w, frame_h))
+    if not boxes:
+        # Nothing is moving, so there is nothing to crop around
+        return []
+    for x0, y0, x1, y1 in extra_boxes:
+        boxes.append(_pad_box(x0, y0, x1, y1, padding, min_size, frame_w, frame_h))
+
+    # Merge overlapping boxes until none overlap
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(boxes)):
+            for j in range(i + 1, len(boxes)):
+                if _overlaps(boxes[i], boxes[j]):
+                    a, b = boxes[i], boxes[j]
+                    boxes[i] = (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+                    del boxes[j]
+                    merged = True
+                    break
+            if merged:
+                break
+
+    covered = sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in boxes)
+    if covered > max_coverage * frame_w * frame_h:
+        return []
+    return boxes
+
+
+def group_rois_by_size(rois, stride=32, max_size=640):
+    """
+    Group regions by the inference size that fits them.
+
+    Each region gets the smallest stride-aligned size (capped at max_size) that
+    holds its longer side, so a 160x160 crop is run at 160 instead of being
+    upscaled to the model's default 640. Regions sharing a size can go into one
+    batch. Returns {imgsz: [region indices]}.
+    """
+    groups = {}
+    for i, (x0, y0, x1, y1) in enumerate(rois):
+        longest = max(x1 - x0, y1 - y0)
+        imgsz = min(max_size, -(-longest // stride) * stride)
+        groups.setdefault(imgsz, []).append(i)
+    return groups
+
+
+def crop_rois(frame, rois):
+    """Return (crops, offsets) for the given regions; offsets map crop coordinates back to the frame."""
+    crops = [frame[y0:y1, x0:x1] for x0, y0, x1, y1 in rois]
+    offsets = [(x0, y0) for x0, y0, _, _ in rois]
+    return crops, offsets
+
+
+def _pad_box(x0, y0, x1, y1, padding, min_size, frame_w, frame_h):
+    x0, y0, x1, y1 = x0 - padding, y0 - padding, x1 + padding, y1 + padding
+
+    # Grow small boxes around their centre
+    if x1 - x0 < min_size:
+        grow = (min_size - (x1 - x0)) // 2
+        x0, x1 = x0 - grow, x1 + grow
+    if y1 - y0 < min_size:
+        grow = (min_size - (y1 - y0)) // 2
+        y0, y1 = y0 - grow, y1 + grow
+
+    return max(0, x0), max(0, y0), min(frame_w, x1), min(frame_h, y1)
+
+
+def _overlaps(a, b):
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
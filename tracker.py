@@ -0,0 +1,255 @@
+from collections import namedtuple
+
+import numpy as np
+from detections import Detections
+
+# Track lifecycle events
+EVENT_NEW = "new"      # a track was confirmed
+EVENT_DWELL = "dwell"  # a track has been in view for another `dwell_time` seconds
+EVENT_LOST = "lost"    # a confirmed track was missed by more than `max_misses` inferences in a row
+
+# One lifecycle event; bbox and confidence are the track's latest, dwell is seconds in view
+TrackEvent = namedtuple("TrackEvent", ["kind", "track_id", "label", "confidence", "bbox", "timestamp", "dwell"])
+
+
+def box_to_state(box):
+    """(x_min, y_min, x_max, y_max) -> (cx, cy, w, h)."""
+    x_min, y_min, x_max, y_max = box
+    return np.array([(x_min + x_max) / 2.0, (y_min + y_max) / 2.0, x_max - x_min, y_max - y_min], dtype=np.float64)
+
+
+def state_to_box(state):
+    """(cx, cy, w, h, ...) -> (x_min, y_min, x_max, y_max)."""
+    cx, cy, w, h = state[:4]
+    return np.array([cx - w / 2.0, cy - h / 2.0, cx + w / 2.0, cy + h / 2.0])
+
+
+def iou_matrix(boxes_a, boxes_b):
+    """Pairwise IoU between two (N, 4) and (M, 4) arrays of xyxy boxes."""
+    a = np.asarray(boxes_a, dtype=np.float64)[:, None, :]
+    b = np.asarray(boxes_b, dtype=np.float64)[None, :, :]
+    inter_w = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    inter_h = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = inter_w * inter_h
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    union = area_a + area_b - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-9), 0.0)
+
+
+class KalmanBoxTrack:
+    """
+    One tracked object: a constant-velocity Kalman filter over (cx, cy, w, h).
+
+    State is (cx, cy, w, h, vcx, vcy, vw, vh), with velocities in pixels per
+    second, so predictions stay right when frames arrive at uneven intervals.
+    """
+
+    # Noise levels (pixels, pixels/second)
+    POSITION_NOISE = 10.0
+    VELOCITY_NOISE = 200.0
+    MEASUREMENT_NOISE = 4.0
+
+    def __init__(self, track_id, box, confidence, class_id, timestamp):
+        self.track_id = track_id
+        self.class_id = class_id
+        self.confidence = confidence
+        self.x = np.zeros(8)
+        self.x[:4] = box_to_state(box)
+        self.P = np.diag([self.MEASUREMENT_NOISE ** 2] * 4 + [self.VELOCITY_NOISE ** 2] * 4)
+        self.first_seen = timestamp
+        self.last_update = timestamp
+        self.last_predict = timestamp
+        self.hits = 1
+        self.misses = 0  # inferences in a row that didn't match this track
+        self.confirmed = False
+        self.dwell_events = 0
+
+    def predict(self, timestamp):
+        """Advance the state to `timestamp` and return the predicted box."""
+        dt = timestamp - self.last_predict
+        if dt > 0:
+            F = np.eye(8)
+            F[:4, 4:] = np.eye(4) * dt
+            Q = np.diag([(self.POSITION_NOISE * dt) ** 2] * 4 + [(self.VELOCITY_NOISE * dt) ** 2] * 4)
+            self.x = F @ self.x
+            self.P = F @ self.P @ F.T + Q
+            # Boxes never collapse or turn inside out while coasting
+            self.x[2:4] = np.maximum(self.x[2:4], 1.0)
+            self.last_predict = timestamp
+        return self.box()
+
+    def update(self, box, confidence, timestamp):
+        """Correct the state with a measured box."""
+        self.predict(timestamp)
+        z = box_to_state(box)
+        H = np.zeros((4, 8))
+        H[:, :4] = np.eye(4)
+        R = np.eye(4) * self.MEASUREMENT_NOISE ** 2
+        S = H @ self.P @ H.T + R
+        K = self.P @ H.T @ np.linalg.inv(S)
+        self.x = self.x + K @ (z - H @ self.x)
+        self.P = (np.eye(8) - K @ H) @ self.P
+        self.confidence = confidence
+        self.last_update = timestamp
+        self.hits += 1
+        self.misses = 0
+
+    def box(self):
+        return state_to_box(self.x)
+
+
+class MultiObjectTracker:
+    """
+    Associate detections across inferences and move boxes on the frames in between.
+
+    update() matches fresh detections to the existing tracks (same class only) by
+    IoU against the predicted boxes, falling back to centroid distance for fast
+    movers whose boxes no longer overlap. predict() moves every track to the
+    current time, for frames where YOLO didn't run. Tracks missed by more than
+    `max_misses` inferences in a row are dropped; counting inferences rather
+    than seconds keeps ids stable however far apart inferences are. Both
+    return Detections with track ids.
+
+    Lifecycle events (TrackEvent) are queued as they happen and collected with
+    pop_events(): EVENT_NEW once a track has been matched `min_hits` times,
+    EVENT_DWELL every `dwell_time` seconds it stays in view, and EVENT_LOST
+    when a confirmed track is dropped.
+    """
+
+    def __init__(self, names, iou_threshold=0.3, max_misses=2, centroid_factor=1.0, min_hits=1, dwell_time=60.0):
+        self.names = names
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.min_hits = min_hits
+        self.dwell_time = dwell_time
+        # A centroid match is accepted within centroid_factor * the track's box diagonal
+        self.centroid_factor = centroid_factor
+        self.tracks = []
+        self.next_id = 1
+        self.events = []
+        # Ids of the tracks matched or created by the last update()
+        self.updated_ids = set()
+
+    def _associate(self, predicted, detections):
+        """Greedy matching; returns a list of (track_index, detection_index)."""
+        if not self.tracks or not len(detections):
+            return []
+
+        same_class = np.array([t.class_id for t in self.tracks])[:, None] == detections.class_id[None, :]
+        iou = np.where(same_class, iou_matrix(predicted, detections.xyxy), 0.0)
+
+        matches = []
+        used_tracks, used_dets = set(), set()
+        # Highest IoU first
+        for flat in np.argsort(-iou, axis=None):
+            ti, di = np.unravel_index(flat, iou.shape)
+            if iou[ti, di] < self.iou_threshold:
+                break
+            if ti in used_tracks or di in used_dets:
+                continue
+            matches.append((ti, di))
+            used_tracks.add(ti)
+            used_dets.add(di)
+
+        # Centroid fallback for whatever is left
+        centers_t = (predicted[:, :2] + predicted[:, 2:]) / 2.0
+        centers_d = (detections.xyxy[:, :2] + detections.xyxy[:, 2:]) / 2.0
+        dist = np.linalg.norm(centers_t[:, None, :] - centers_d[None, :, :], axis=2)
+        diag = np.linalg.norm(predicted[:, 2:] - predicted[:, :2], axis=1)
+        allowed = same_class & (dist <= (diag * self.centroid_factor)[:, None])
+        dist = np.where(allowed, dist, np.inf)
+        for flat in np.argsort(dist, axis=None):
+            ti, di = np.unravel_index(flat, dist.shape)
+            if not np.isfinite(dist[ti, di]):
+                break
+            if ti in used_tracks or di in used_dets:
+                continue
+            matches.append((ti, di))
+            used_tracks.add(ti)
+            used_dets.add(di)
+        return matches
+
+    def update(self, detections, timestamp):
+        """Feed fresh detections from an inference. Returns the current tracks as Detections."""
+        predicted = np.array([t.predict(timestamp) for t in self.tracks]).reshape(-1, 4)
+        matches = self._associate(predicted, detections)
+
+        matched_dets = set()
+        self.updated_ids = set()
+        for ti, di in matches:
+            self.tracks[ti].update(detections.xyxy[di], float(detections.confidence[di]), timestamp)
+            matched_dets.add(di)
+            self.updated_ids.add(self.tracks[ti].track_id)
+        for track in self.tracks:
+            if track.track_id not in self.updated_ids:
+                track.misses += 1
+
+        for di in range(len(detections)):
+            if di not in matched_dets:
+                self.tracks.append(KalmanBoxTrack(
+                    self.next_id, detections.xyxy[di], float(detections.confidence[di]),
+                    int(detections.class_id[di]), timestamp
+                ))
+                self.updated_ids.add(self.next_id)
+                self.next_id += 1
+
+        self._drop_missed(timestamp)
+        self._lifecycle(timestamp)
+        return self._as_detections()
+
+    def predict(self, timestamp):
+        """Move every track to `timestamp` (no new detections). Returns the current tracks."""
+        for track in self.tracks:
+            track.predict(timestamp)
+        self._lifecycle(timestamp)
+        return self._as_detections()
+
+    def pop_events(self):
+        """Return and clear the events queued since the last call."""
+        events, self.events = self.events, []
+        return events
+
+    def _event(self, kind, track, timestamp):
+        self.events.append(TrackEvent(
+            kind, track.track_id, self.names.get(track.class_id, str(track.class_id)), track.confidence,
+            tuple(int(v) for v in track.box().round()), timestamp, timestamp - track.first_seen
+        ))
+
+    def _drop_missed(self, timestamp):
+        kept = []
+        for track in self.tracks:
+            if track.misses <= self.max_misses:
+                kept.append(track)
+            elif track.confirmed:
+                self._event(EVENT_LOST, track, timestamp)
+        self.tracks = kept
+
+    def _lifecycle(self, timestamp):
+        for track in self.tracks:
+            if not track.confirmed:
+                if track.hits >= self.min_hits:
+                    track.confirmed = True
+                    self._event(EVENT_NEW, track, timestamp)
+                continue
+            if self.dwell_time and timestamp - track.first_seen >= self.dwell_time * (track.dwell_events + 1):
+                track.dwell_events += 1
+                self._event(EVENT_DWELL, track, timestamp)
+
+    def _as_detections(self):
+        if not self.tracks:
+            # Empty, but still tracked: track_id is only None for untracked detections
+            return Detections(
+                np.empty((0, 4), dtype=np.int32),
+                np.empty(0, dtype=np.float32),
+                np.empty(0, dtype=np.int32),
+                self.names,
+                np.empty(0, dtype=np.int32),
+            )
+        return Detections(
+            np.array([t.box() for t in self.tracks]).round().astype(np.int32),
+            np.array([t.confidence for t in self.tracks], dtype=np.float32),
+            np.array([t.class_id for t in self.tracks], dtype=np.int32),
+            self.names,
+            np.array([t.track_id for t in self.tracks], dtype=np.int32),
+        )
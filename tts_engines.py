@@ -0,0 +1,165 @@
+import hashlib
+import os
+import shutil
+import subprocess
+import wave
+from datetime import datetime
+from audio_artifacts import AudioArtifactManager
+
+# Every cached clip is normalized to this format, so clips can be concatenated and played as raw PCM
+SAMPLE_RATE = 22050
+CHANNELS = 1
+SAMPLE_WIDTH = 2  # 16-bit
+
+# Default cache location, next to the frames and logs
+TTS_CACHE_DIR = os.path.join(os.getcwd(), "tts_cache")
+
+
+class TTSBackend:
+    """
+    Interface for text-to-speech engines.
+
+    `synthesize` writes speech for `text` to `output_path` in any format ffmpeg
+    can read; `name` is part of the cache key, so clips from different engines
+    never mix.
+    """
+
+    name = "base"
+
+    def synthesize(self, text, lang, output_path):
+        raise NotImplementedError
+
+    def is_available(self):
+        return True
+
+
+class GTTSBackend(TTSBackend):
+    """Google TTS (needs network access)."""
+
+    name = "gtts"
+
+    def synthesize(self, text, lang, output_path):
+        from gtts import gTTS  # Imported lazily so offline-only setups don't need it
+        gTTS(text=text, lang=lang).save(output_path)
+
+    def is_available(self):
+        try:
+            import gtts  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+
+class EspeakBackend(TTSBackend):
+    """Local, offline synthesis with espeak-ng (or espeak)."""
+
+    name = "espeak"
+
+    # espeak voice names for the gTTS language codes we use
+    VOICES = {"pt-br": "pt-br", "pt": "pt", "en": "en"}
+
+    def __init__(self, executable=None):
+        self.executable = executable or shutil.which("espeak-ng") or shutil.which("espeak")
+
+    def synthesize(self, text, lang, output_path):
+        if not self.executable:
+            raise RuntimeError("espeak-ng is not installed")
+        voice = self.VOICES.get(lang, lang)
+        subprocess.run(
+            [self.executable, "-v", voice, "-w", output_path, text],
+            check=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+
+    def is_available(self):
+        return self.executable is not None
+
+
+BACKENDS = {
+    GTTSBackend.name: GTTSBackend,
+    EspeakBackend.name: EspeakBackend,
+}
+
+
+def create_backend(name):
+    """Create a backend by name ("gtts" or "espeak")."""
+    if name not in BACKENDS:
+        raise ValueError("Unknown TTS backend", name)
+    return BACKENDS[name]()
+
+
+class TTSCache:
+    """
+    Content-addressed cache of synthesized, tempo-adjusted speech.
+
+    Entries are keyed by (backend, text, language, speed) and stored as WAV in
+    the common PCM format, so a repeated phrase plays back with no synthesis
+    and no transcoding at all. Files live in an AudioArtifactManager spool:
+    scratch files have unique names, entries in use are never deleted, and the
+    cache is bounded to `max_bytes`.
+    """
+
+    def __init__(self, cache_dir=TTS_CACHE_DIR, max_bytes=64 * 1024 * 1024):
+        self.artifacts = AudioArtifactManager(cache_dir, max_bytes)
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, backend, text, lang, speed):
+        raw = f"{backend.name}\0{lang}\0{speed:.3f}\0{text}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def acquire(self, backend, text, lang="pt-br", speed=1.0):
+        """
+        Return (key, path) of the cached clip, synthesizing it on a miss.
+        The clip is held until release(key) is called.
+        """
+        key = self.key(backend, text, lang, speed)
+        path = self.artifacts.acquire(key)
+        if path is not None:
+            self.hits += 1
+            return key, path
+
+        self.misses += 1
+        original_audio = self.artifacts.new_temp(".audio")
+        adjusted_audio = self.artifacts.new_temp(".wav")
+        try:
+            backend.synthesize(text, lang, original_audio)
+            convert_audio(original_audio, adjusted_audio, speed)
+            path = self.artifacts.commit(key, adjusted_audio)
+        finally:
+            self.artifacts.discard(original_audio)
+            self.artifacts.discard(adjusted_audio)
+        print(f"[{datetime.now()}] TTS clip cached: {path}")
+        return key, path
+
+    def release(self, key):
+        self.artifacts.release(key)
+
+    def read_pcm(self, backend, text, lang="pt-br", speed=1.0):
+        """Return the clip's PCM, synthesizing it on a miss."""
+        key, path = self.acquire(backend, text, lang, speed)
+        try:
+            return read_wav_pcm(path)
+        finally:
+            self.release(key)
+
+
+def read_wav_pcm(path):
+    """Return the raw PCM frames of a WAV file in the common clip format."""
+    with wave.open(path, "rb") as wav:
+        if (wav.getframerate(), wav.getnchannels(), wav.getsampwidth()) != (SAMPLE_RATE, CHANNELS, SAMPLE_WIDTH):
+            raise ValueError("Unexpected audio format", path)
+        return wav.readframes(wav.getnframes())
+
+
+def convert_audio(input_path, output_path, speed=1.0):
+    """Tempo-adjust any audio file and convert it to the common WAV format with ffmpeg."""
+    subprocess.run(
+        [
+            "ffmpeg", "-i", input_path, "-filter:a", f"atempo={speed}",
+            "-ar", str(SAMPLE_RATE), "-ac", str(CHANNELS), "-sample_fmt", "s16",
+            "-vn", "-f", "wav", output_path, "-y", "-loglevel", "quiet"
+        ],
+        check=True
+    )
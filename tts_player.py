@@ -1,54 +1,109 @@
-import time
 import threading
 import os
-import subprocess
-from gtts import gTTS
+from datetime import datetime
+from tts_engines import TTSCache, EspeakBackend, create_backend
+from phrase_audio import PhraseAssembler
+from audio_output import AudioOutputService, PRIORITY_MOTION
+from rate_limiter import AlertRateLimiter, RateDecision
+from alert_dispatcher import AlertDispatcher
 
-# Global variable to track the last audio playback time
-last_audio_time = 0
+# Per-category (and per-camera) cooldowns, shared by every caller
+alert_limiter = AlertRateLimiter()
 
-def play_gtts_text(text, cooldown=10, speed=1.0):
+# TTS engine (VIGIA_TTS_BACKEND=gtts|espeak); the offline engine is used when it fails
+tts_backend = create_backend(os.environ.get("VIGIA_TTS_BACKEND", "gtts"))
+offline_backend = EspeakBackend()
+tts_cache = TTSCache()
+
+def get_speech_pcm(text, lang="pt-br", speed=1.0):
+    """
+    Return the PCM of the cached, tempo-adjusted speech for the text.
+    Falls back to the offline engine if the configured one fails (e.g. no network).
+    """
+    try:
+        return tts_cache.read_pcm(tts_backend, text, lang, speed)
+    except Exception as e:
+        if tts_backend.name == offline_backend.name or not offline_backend.is_available():
+            raise
+        print(f"[{datetime.now()}] TTS backend '{tts_backend.name}' failed ({e}), using offline engine.")
+        return tts_cache.read_pcm(offline_backend, text, lang, speed)
+
+# Timestamped announcements are assembled from cached fragments instead of synthesized per call
+phrase_assembler = PhraseAssembler(get_speech_pcm, lang="pt-br")
+
+# (prefixes, speed) combinations already being pre-rendered
+_warmed_up = set()
+_warm_up_lock = threading.Lock()
+
+def warm_up_announcements(prefixes, speed):
+    """Pre-render announcement fragments on a background thread (once per prefixes/speed)."""
+    key = (tuple(prefixes), speed)
+    with _warm_up_lock:
+        if key in _warmed_up:
+            return
+        _warmed_up.add(key)
+    threading.Thread(target=phrase_assembler.prerender, args=(prefixes, speed), daemon=True).start()
+
+# One long-lived playback worker for every alert (sink chosen by VIGIA_AUDIO_SINK)
+audio_service = AudioOutputService()
+
+# Synthesis, tempo adjustment and hand-off to playback run here, never in the caller's loop
+alert_dispatcher = AlertDispatcher(max_workers=2, max_in_flight=4)
+
+def close_audio():
+    """Finish in-flight alerts, play whatever is still queued and release the audio output."""
+    alert_dispatcher.close()
+    stats = alert_dispatcher.stats()
+    print(f"[INFO] Alerts dispatched: {stats['dispatched']}, rejected: {stats['rejected']}, "
+          f"failed: {stats['failed']}, avg latency: {stats['latency_avg_ms']:.1f} ms, "
+          f"max latency: {stats['latency_max_ms']:.1f} ms")
+    audio_service.close()
+
+def _dispatch_alert(decision, job, name):
+    """Run an allowed alert on the dispatcher; reports back if it had to be rejected."""
+    if alert_dispatcher.dispatch(job, name):
+        return decision
+    return RateDecision(False, decision.key, "too many alerts in flight", 0.0)
+
+def play_timed_announcement(prefix, detection_time, cooldown=10, speed=1.0, priority=PRIORITY_MOTION,
+                            category="motion", camera=None):
+    """
+    Play "<prefix> HH horas, MM minutos e SS segundos." without blocking the caller.
+    The audio is assembled from pre-rendered fragments, so no synthesis is needed.
+    priority: PRIORITY_PERSON alerts replace queued/playing lower-priority ones.
+    category, camera: rate-limit key; the cooldown only applies to alerts with the same key.
+    Returns the RateDecision for the alert.
+    """
+    # Respect cooldown to avoid frequent audio playback
+    decision = alert_limiter.check(category, camera, cooldown)
+    if not decision.allowed:
+        return decision
+
+    def job():
+        audio_service.play(phrase_assembler.announcement(prefix, detection_time, speed), priority)
+
+    return _dispatch_alert(decision, job, prefix)
+
+def play_gtts_text(text, cooldown=10, speed=1.0, priority=PRIORITY_MOTION, category="motion", camera=None):
     """
-    Generate and play speech from text using Google TTS in a non-blocking manner.
+    Generate and play speech from text without blocking the caller.
+    Phrases are synthesized once and then served from the TTS cache.
     text: The text to be spoken.
-    cooldown: Minimum number of seconds before another audio can be played.
+    cooldown: Minimum number of seconds before another alert with the same category/camera.
     speed: Playback speed (1.0 is normal, >1.0 is faster, <1.0 is slower).
+    priority: PRIORITY_PERSON alerts replace queued/playing lower-priority ones.
+    category, camera: rate-limit key; the cooldown only applies to alerts with the same key.
+    Returns the RateDecision for the alert.
     """
-    global last_audio_time
-    current_time = time.time()
-
     # Respect cooldown to avoid frequent audio playback
-    if current_time - last_audio_time < cooldown:
-        return
-
-    # Generate audio file
-    original_audio = "detection_sound_original.mp3"
-    tts = gTTS(text=text, lang="pt-br")
-    tts.save(original_audio)
-
-    # Modify playback speed using ffmpeg
-    adjusted_audio = "detection_sound_adjusted.mp3"
-    subprocess.run(
-        [
-            "ffmpeg", "-i", original_audio, "-filter:a", f"atempo={speed}",
-            "-vn", adjusted_audio, "-y", "-loglevel", "quiet"
-        ]
-    )
-
-    # Play audio in a background thread
-    def play_audio_file(file_path):
-        subprocess.Popen(
-            ["ffplay", "-nodisp", "-autoexit", "-loglevel", "quiet", file_path],
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.STDOUT
-        ).wait()
-        # Cleanup after playback
-        os.remove(file_path)
-
-    threading.Thread(target=play_audio_file, args=(adjusted_audio,), daemon=True).start()
-
-    # Cleanup original audio file
-    os.remove(original_audio)
-
-    # Update the last audio time
-    last_audio_time = current_time
+    decision = alert_limiter.check(category, camera, cooldown)
+    if not decision.allowed:
+        return decision
+
+    def job():
+        # Decoded once, then kept in memory like the announcement fragments
+        pcm = phrase_assembler.clip_pcm(text, speed)
+        # Hand the PCM to the playback worker
+        audio_service.play(pcm, priority)
+
+    return _dispatch_alert(decision, job, text)